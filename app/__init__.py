@@ -4,7 +4,6 @@
 
 
 import os
-import time
 from uuid import uuid4
 from datetime import datetime
 from contextlib import asynccontextmanager
@@ -17,6 +16,12 @@ from fastapi.exceptions import HTTPException, RequestValidationError
 from app.logger import Rotolog
 from app.config import Settings
 from app.core.clients.database_client import DatabaseClient
+from app.core.middleware.admission_control import (
+    AdaptiveConcurrencyLimit,
+    AdmissionControlMiddleware,
+    DatabaseLatencyListener,
+    TokenBucketRateLimiter,
+)
 
 
 ###########################
@@ -43,34 +48,151 @@ logger = Rotolog(
 logger.info("application started")
 
 
+# Compile the grammars of custom keys and of every short key, system generated or custom.
+# Once short_key_grammar_enforced is set and existing keys are checked, no mapping exists
+# for a key outside of the short key grammar
+from app.utils.utils import SHORT_KEY_ALPHABET, compile_key_grammar
+
+custom_key_grammar = compile_key_grammar(
+    SHORT_KEY_ALPHABET + config.custom_key_extra_characters,
+    config.custom_key_min_length,
+    config.custom_key_max_length,
+)
+short_key_grammar = compile_key_grammar(
+    SHORT_KEY_ALPHABET + config.custom_key_extra_characters,
+    min(config.short_key_min_length, config.custom_key_min_length),
+    max(config.short_key_max_length, config.custom_key_max_length),
+)
+
+
+# Initialize RequestSummaryLogger, which writes one structured line per request
+from app.core.tracing.request_trace import (
+    RequestSummaryLogger,
+    annotate,
+    current_trace,
+    end_trace,
+    record_error,
+)
+
+request_summary_logger = RequestSummaryLogger(
+    logger,
+    verbosity=config.log_request_verbosity,
+    success_sample_rate=config.log_success_sample_rate,
+)
+
+
+# Initialize RequestProfiler, only consulted when profiling is enabled
+from app.core.profiling.request_profiler import RequestProfiler
+
+request_profiler = RequestProfiler(
+    token=config.profiling_token.get_secret_value(),
+    sample_rate=config.profiling_sample_rate,
+    dump_dir=config.profiling_dump_dir,
+    max_dumps=config.profiling_max_dumps,
+)
+
+
 ###################
 ## Clients Setup ##
 ###################
 
 
-# Setup DatabaseClient
-database_client = DatabaseClient(
-    db_username=config.db_username.get_secret_value(),
-    db_password=config.db_password.get_secret_value(),
-    db_host=config.db_host,
-    db_name=config.db_name,
-    db_port=config.db_port,
+# Setup AdaptiveConcurrencyLimit, fed with the latency of every database command (or SQLite operation)
+concurrency_limit = AdaptiveConcurrencyLimit(
+    initial_limit=config.admission_initial_limit,
+    min_limit=config.admission_min_limit,
+    max_limit=config.admission_max_limit,
+    target_latency_ms=config.admission_target_latency_ms,
+    backoff_ratio=config.admission_backoff_ratio,
+    low_priority_share=config.admission_low_priority_share,
+)
+
+# Setup DatabaseClient, only needed when MongoDB stores url mappings or idempotent responses
+database_client = None
+if config.storage_backend == "mongo" or config.idempotency_mirror_to_db:
+    database_client = DatabaseClient(
+        db_username=config.db_username.get_secret_value(),
+        db_password=config.db_password.get_secret_value(),
+        db_host=config.db_host,
+        db_name=config.db_name,
+        db_port=config.db_port,
+        url_mappings_collection_name=config.db_url_mappings_collection_name,
+        url_mapping_routes_collection_name=config.db_url_mapping_routes_collection_name,
+        shards=config.db_shards,
+        previous_shards=config.db_shards_previous,
+        virtual_nodes=config.db_shard_virtual_nodes,
+        event_listeners=[DatabaseLatencyListener(concurrency_limit)] if config.admission_control_enabled else None,
+    )
+    logger.debug(f"setup databaseclient {database_client}")
+
+
+from app.core.clients.hedged_reader import HedgedReader
+
+# Setup HedgedReader for redirect reads
+hedged_reader = HedgedReader(
+    enabled=config.db_hedged_reads_enabled,
+    quantile=config.db_hedge_quantile,
+    min_delay_ms=config.db_hedge_min_delay_ms,
+    read_preference=config.db_hedge_read_preference,
+)
+logger.debug(f"setup hedgedreader {hedged_reader}")
+
+
+# Setup StorageBackend of url mappings
+if config.storage_backend == "sqlite":
+    from app.core.storage.sqlite_backend import SQLiteStorageBackend
+
+    storage_backend = SQLiteStorageBackend(
+        path=config.sqlite_path,
+        busy_timeout_ms=config.sqlite_busy_timeout_ms,
+        latency_observer=concurrency_limit.observe_latency if config.admission_control_enabled else None,
+    )
+else:
+    from app.core.storage.mongo_backend import MongoStorageBackend
+
+    storage_backend = MongoStorageBackend(
+        database_client=database_client,
+        hedged_reader=hedged_reader,
+        read_timeout_ms=config.db_read_timeout_ms,
+    )
+logger.debug(f"setup storagebackend {storage_backend}")
+
+
+from app.core.clients.hits_counter import HitsCounter
+
+# Setup HitsCounter, which writes the hits of redirects in batches
+hits_counter = HitsCounter(
+    storage_backend=storage_backend,
+    flush_interval_ms=config.hits_flush_interval_ms,
+    write_timeout_ms=config.db_write_timeout_ms,
+    logger=logger,
 )
-logger.debug(f"setup databaseclient {database_client}")
+logger.debug(f"setup hitscounter {hits_counter}")
+
+
+from app.core.clients.idempotency_client import IdempotencyClient
 
+# Setup IdempotencyClient
+idempotency_client = IdempotencyClient(
+    max_entries=config.idempotency_max_entries,
+    ttl_seconds=config.idempotency_ttl_seconds,
+    mirror_to_db=config.idempotency_mirror_to_db,
+)
+logger.debug(f"setup idempotencyclient {idempotency_client}")
 
 
 #####################
 ## Lifespan Events ##
 #####################
 
-from app.core.models.models import UrlMappings
+from app.core.models.models import UrlMappings, IdempotencyRecords
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """    
-    Establishes a database connection when entering the context and closes it when exiting.
+    Establishes the database connection, opens the storage backend and starts the hits counter
+    when entering the context, and stops and closes them when exiting.
 
     Args:
         app (FastAPI): The FastAPI application instance.
@@ -80,13 +202,22 @@ async def lifespan(app: FastAPI):
     """
 
     # Create DB connection
-    await database_client.connect([UrlMappings, ])
+    if database_client:
+        document_models = [UrlMappings, ] if config.storage_backend == "mongo" else []
+        if config.idempotency_mirror_to_db:
+            document_models.append(IdempotencyRecords)
+        await database_client.connect(document_models)
+    await storage_backend.connect()
+    await hits_counter.start()
     
     try:
         yield
     finally:
-        # Close DB connection when exiting
-        await database_client.disconnect()
+        # Write the pending hits, then close DB connection when exiting
+        await hits_counter.stop()
+        await storage_backend.disconnect()
+        if database_client:
+            await database_client.disconnect()
 
 ###################
 ## Fastapi Setup ##
@@ -115,12 +246,12 @@ logger.debug("fastapi object initialized")  # log fastapi initialization
 ################
 
 
-# middleware to log incoming requests and outgoing responses.
+# middleware to trace requests and log one summary line per request.
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
 
     """
-    middleware to log incoming requests and outgoing responses.
+    middleware to trace requests and log one summary line per request.
 
     args:
         request (Request): the incoming request.
@@ -130,31 +261,78 @@ async def log_requests(request: Request, call_next):
         Response: the response to be sent.
     """
 
-    start_time = time.time()
     request_id = str(uuid4())
-
-    # log the request received, including headers and body
-    logger.info(f"[{request_id}] received - client host:{request.client.host} request:{request.method} {request.url.path} headers:{request.headers}")
-
+    trace_token = request_summary_logger.start(request_id)
     request.state.request_id = request_id
-    response = await call_next(request)
-    execution_time = time.time() - start_time
 
-    # log response
-    logger.info(f"[{request_id}] sent - client host:{request.client.host} request:{request.method} {request.url.path} status code:{response.status_code} execution time:{execution_time}")
-    return response
+    # profile the request if profiling is enabled and the request asks for it or is sampled
+    profiled_request = None
+    if config.profiling_enabled:
+        profiled_request = request_profiler.start(request_id, request.headers.get("x-profile"))
+
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    except Exception as e:
+        record_error(str(e))
+        raise
+    finally:
+        trace = current_trace()
+        route = request.scope.get("route")
+
+        try:
+            if profiled_request:
+                try:
+                    dump_path = await request_profiler.finish(
+                        profiled_request, trace, request.method, request.url.path, status_code
+                    )
+                    annotate(profile=dump_path)
+                except Exception as e:
+                    # a failed dump (e.g. a full disk) must not replace the response
+                    annotate(profile_error=repr(e))
+
+            # log the request summary
+            request_summary_logger.log(
+                trace,
+                method=request.method,
+                route=route.path if route else request.url.path,
+                path=request.url.path,
+                status_code=status_code,
+                client_host=request.client.host if request.client else None,
+            )
+        finally:
+            end_trace(trace_token)
 
 logger.debug("added logging middleware")
 
 
-# Middleware to handle CORS
-app.add_middleware(
-    CORSMiddleware,
+# Per client rate limits, shared with the redirect fast lane
+rate_limiter = TokenBucketRateLimiter(
+    rate=config.rate_limit_rate,
+    burst=config.rate_limit_burst,
+) if config.rate_limit_enabled else None
+
+# Middleware to shed load when over capacity or over a client's rate limit
+if config.admission_control_enabled or rate_limiter:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        concurrency_limit=concurrency_limit if config.admission_control_enabled else None,
+        rate_limiter=rate_limiter,
+        retry_after_seconds=config.admission_retry_after_seconds,
+    )
+    logger.debug("added admission control middleware")
+
+
+# Middleware to handle CORS, also applied by the redirect fast lane
+cors_options = dict(
     allow_origins=config.cors_allow_origins,
     allow_credentials=config.cors_allow_credentials,
     allow_methods=config.cors_allow_methods,
     allow_headers=config.cors_allow_headers,
 )
+app.add_middleware(CORSMiddleware, **cors_options)
 logger.debug("added cors middleware")
 
 
@@ -187,6 +365,25 @@ async def ping():
     return ORJSONResponse(status_code=status.HTTP_200_OK, content=content)
 
 
+@app.get("/metrics", tags=["management"], include_in_schema=False)
+async def metrics():
+    """
+    Define a route for the "/metrics" endpoint to expose the runtime counters of the application.
+
+    Returns:
+    - ORJSONResponse: A JSON response with the admission control, hedged read, hits and
+                      rejected short key counters.
+    """
+    content = {
+        "admission_control": concurrency_limit.stats(),
+        "hedged_reads": hedged_reader.stats(),
+        "hits": hits_counter.stats(),
+        "short_key_filter": short_key_filter.stats() if short_key_filter else {"enabled": False},
+    }
+
+    return ORJSONResponse(status_code=status.HTTP_200_OK, content=content)
+
+
 # Add router to main FastAPI app
 from app.api.api import api
 app.include_router(api, prefix="")
@@ -219,8 +416,8 @@ async def request_validation_exception_handler(request: Request, exc: Exception)
     # Extract request_id from request state
     _request_id = request.state.request_id
 
-    # Extract the error message from the exception and log it
-    logger.error(f"[{_request_id}] {exc.args}")
+    # Extract the error message from the exception and add it to the request summary
+    record_error(str(exc.args))
 
     # Construct ErrorResponse
     _response_body = ErrorResponse.construct_response(
@@ -255,8 +452,8 @@ async def http_exception_handler(request: Request, exc: Exception):
     # Extract request_id from request state
     _request_id = request.state.request_id
 
-    # Extract the error message from the exception and log it
-    logger.error(f"[{_request_id}] {exc.status_code} {exc.detail}")
+    # Extract the error message from the exception and add it to the request summary
+    record_error(f"{exc.status_code} {exc.detail}")
 
     # Construct ErrorResponse
     _response_body = ErrorResponse.construct_response(
@@ -285,15 +482,14 @@ async def internal_server_error_exception_handler(request: Request, exc: Excepti
     - ORJSONResponse: JSON response with an error message and HTTP 500 status code.
     
     Actions:
-    - Logs the error in the log file using the logger.
     - Constructs an ErrorResponse with the error message and other metadata.
+    - The error itself is logged in the request summary by the logging middleware.
     """
 
     _request_id = request.state.request_id
 
-    # Extract the error message from the exception and log it
+    # Extract the error message from the exception
     error_message = str(exc.with_traceback(None))
-    logger.error(f"[{_request_id}] {error_message}")
 
     # Construct ErrorResponse
     _response_body = ErrorResponse.construct_response(
@@ -307,3 +503,41 @@ async def internal_server_error_exception_handler(request: Request, exc: Excepti
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=_response_body.model_dump()
     )
+
+
+########################
+## Redirect Fast Lane ##
+########################
+
+from app.core.middleware.redirect_fast_lane import RedirectFastLane
+from app.core.middleware.short_key_filter import ShortKeyFilter
+
+
+# ASGI application to serve, the FastAPI app behind the redirect fast lane and the
+# short key filter if enabled
+asgi_app = app
+
+if config.redirect_fast_lane_enabled:
+    asgi_app = RedirectFastLane(
+        app,
+        storage_backend=storage_backend,
+        summary_logger=request_summary_logger,
+        hits_counter=hits_counter,
+        key_pattern=short_key_grammar.pattern,
+        read_timeout_ms=config.db_read_timeout_ms,
+        redirect_status_code=config.redirect_status_code,
+        redirect_cache_max_age=config.redirect_cache_max_age,
+        concurrency_limit=concurrency_limit if config.admission_control_enabled else None,
+        rate_limiter=rate_limiter,
+        retry_after_seconds=config.admission_retry_after_seconds,
+        cors_options=cors_options,
+    )
+    logger.debug("added redirect fast lane in front of FastAPI app")
+
+# Answer redirects of keys outside of the short key grammar before any lookup
+short_key_filter = None
+
+if config.short_key_grammar_enforced:
+    short_key_filter = ShortKeyFilter(asgi_app, routes=app.routes, key_grammar=short_key_grammar)
+    asgi_app = short_key_filter
+    logger.debug("added short key filter in front of the ASGI app")
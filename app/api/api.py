@@ -2,19 +2,20 @@
 ## Imports ##
 #############
 
-from typing import Union
+import hashlib
+from typing import Optional, Tuple, Union
 
 from fastapi import APIRouter, Body, Header, status, Request
 from fastapi.responses import ORJSONResponse, RedirectResponse
 from fastapi.exceptions import HTTPException
 
-from pymongo.errors import DuplicateKeyError
-
-from app import config, logger
-from app.core.schema.request_schema import SystemShortenUrlRequest, CustomShortenUrlRequest
-from app.core.schema.response_schema import ShortenUrlResponse
-from app.core.models.models import UrlMappings
-from app.utils.utils import create_short_key
+from app import config, storage_backend, idempotency_client, hits_counter, short_key_grammar
+from app.core.schema.request_schema import SystemShortenUrlRequest, CustomShortenUrlRequest, ResolveShortKeysRequest
+from app.core.schema.response_schema import ShortenUrlResponse, ResolveShortKeysResponse
+from app.core.models.models import UrlMappingRecord
+from app.core.storage.storage_backend import DuplicateShortKeyError
+from app.utils.utils import create_short_key, redirect_cache_headers, run_with_deadline
+from app.core.tracing.request_trace import annotate, span
 
 
 ##########
@@ -33,6 +34,7 @@ api = APIRouter(default_response_class=ORJSONResponse)
 async def shorten_url(
     *,
     x_custom_shorten:bool = Header(False, alias="x-custom-shorten"),
+    idempotency_key: Optional[str] = Header(None, alias="idempotency-key", max_length=255),
     req_body : Union[SystemShortenUrlRequest, CustomShortenUrlRequest] = Body(...),
     request: Request,
 ):
@@ -42,6 +44,8 @@ async def shorten_url(
 
     Args:
         x_custom_shorten (bool): Flag to indicate if custom shortening is requested.
+        idempotency_key (Optional[str]): Key identifying retries of the same request, the first
+                                         response is replayed for every retry carrying it.
         req_body (Union[SystemShortenUrlRequest, CustomShortenUrlRequest]): Request body
                                              containing target URL and optional custom key.
         request (Request): The FastAPI request object.
@@ -51,57 +55,180 @@ async def shorten_url(
     """
 
     _request_id = request.state.request_id
+
+    if not idempotency_key:
+        _status_code, _content = await _shorten_url(_request_id, x_custom_shorten, req_body)
+        return ORJSONResponse(status_code=_status_code, content=_content)
+
+    _fingerprint = hashlib.sha256(
+        f"{x_custom_shorten}:{req_body.model_dump_json()}".encode()
+    ).hexdigest()
+
+    async with idempotency_client.lock(idempotency_key):
+
+        stored_response = await idempotency_client.get(idempotency_key)
+
+        if stored_response:
+            if stored_response.fingerprint != _fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="idempotency key was already used with a different request"
+                )
+
+            annotate(idempotency="replayed")
+            return ORJSONResponse(status_code=stored_response.status_code, content=stored_response.body)
+
+        _status_code, _content = await _shorten_url(_request_id, x_custom_shorten, req_body)
+
+        annotate(idempotency="stored")
+        await idempotency_client.put(idempotency_key, _fingerprint, _status_code, _content)
+
+    return ORJSONResponse(status_code=_status_code, content=_content)
+
+
+async def _shorten_url(
+    _request_id: str,
+    x_custom_shorten: bool,
+    req_body: Union[SystemShortenUrlRequest, CustomShortenUrlRequest],
+) -> Tuple[int, dict]:
+
+    """
+    Looks up or creates the mapping for a shorten_url request.
+
+    Args:
+        _request_id (str): The ID of the request.
+        x_custom_shorten (bool): Flag to indicate if custom shortening is requested.
+        req_body (Union[SystemShortenUrlRequest, CustomShortenUrlRequest]): Request body
+                                             containing target URL and optional custom key.
+
+    Returns:
+        Tuple[int, dict]: The status code and body of the response.
+    """
+
     _successful = True
 
-    logger.info(f"[{_request_id}] query target url {req_body.target_url} in UrlMappings")
-    url_mapping = await UrlMappings.find_one(
-        {
-            "target_url": req_body.target_url,
-            "is_active": True
-        }
-    )
+    annotate(target_url=req_body.target_url, custom_key=x_custom_shorten)
+    with span("db_query"):
+        url_mapping = await run_with_deadline(
+            storage_backend.find_by_target(req_body.target_url),
+            config.db_read_timeout_ms
+        )
 
 
     _message = "a mapping between a key and this target_url already exists"
     _status_code = status.HTTP_200_OK
 
-    logger.info(f"[{_request_id}] check if url_mappings exists")
-    if not url_mapping:
+    if url_mapping:
+        annotate(short_key=url_mapping.short_key, outcome="existing")
+
+        # Redirect overrides apply to new mappings only, an existing one is never changed.
+        # Asking for the redirect it already sends (e.g. the default) is not a conflict
+        effective_values = {
+            "redirect_status_code": url_mapping.redirect_status_code or config.redirect_status_code,
+            "redirect_cache_max_age": (
+                url_mapping.redirect_cache_max_age
+                if url_mapping.redirect_cache_max_age is not None
+                else config.redirect_cache_max_age
+            ),
+        }
+        for field, effective_value in effective_values.items():
+            requested = getattr(req_body, field)
+            if requested is not None and requested != effective_value:
+                annotate(outcome="conflicting_overrides")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"a mapping of this target_url exists with another {field}"
+                )
+
+    else:
 
-        logger.info(f"[{_request_id}] create short key")
         short_key = create_short_key(req_body.short_key_length) if not x_custom_shorten else req_body.custom_key
 
-        logger.info(f"[{_request_id}] create url_mappings")
-        url_mapping = UrlMappings(
-            target_url = req_body.target_url,
-            short_key= short_key,
-            hits = 0,
-            is_active = True,
-            is_custom_key = x_custom_shorten,
-            tags = req_body.tags,
-            app_version = config.app_version,
-        )
+        with span("model_hydration"):
+            url_mapping = UrlMappingRecord(
+                target_url = req_body.target_url,
+                short_key= short_key,
+                hits = 0,
+                is_active = True,
+                is_custom_key = x_custom_shorten,
+                tags = req_body.tags,
+                app_version = config.app_version,
+                redirect_status_code = req_body.redirect_status_code,
+                redirect_cache_max_age = req_body.redirect_cache_max_age,
+            )
 
         try:
-            logger.info(f"[{_request_id}] insert url_mappings to db")
-            await url_mapping.insert()
+            with span("db_write"):
+                url_mapping = await run_with_deadline(
+                    storage_backend.insert(url_mapping),
+                    config.db_write_timeout_ms
+                )
+            annotate(short_key=short_key, outcome="created")
 
             _message = f"a mapping between a {short_key} and this {req_body.target_url} created"
             _status_code = status.HTTP_201_CREATED
-        except DuplicateKeyError as e:
+        except DuplicateShortKeyError as e:
+            annotate(short_key=short_key, outcome="duplicate_key")
             _message = "duplicate short key error"
             _status_code = status.HTTP_400_BAD_REQUEST if x_custom_shorten else status.HTTP_500_INTERNAL_SERVER_ERROR
             raise HTTPException(status_code=_status_code, detail=_message) from e
 
-    logger.info(f"[{_request_id}] create response")
-    _response_body = ShortenUrlResponse.construct_response(
-        successful=_successful,
-        request_id=_request_id,
-        message=_message,
-        url_mapping=url_mapping
-    )
+    with span("response_construction"):
+        _response_body = ShortenUrlResponse.construct_response(
+            successful=_successful,
+            request_id=_request_id,
+            message=_message,
+            url_mapping=url_mapping
+        ).model_dump()
 
-    return ORJSONResponse(status_code=_status_code, content=_response_body.model_dump())
+    return _status_code, _response_body
+
+
+
+@api.post(
+    "/resolve",
+)
+async def resolve_short_keys(
+    *,
+    req_body: ResolveShortKeysRequest = Body(...),
+    request: Request,
+):
+
+    """
+    Endpoint to resolve many short keys to their target URLs in one request,
+    without counting hits.
+
+    Args:
+        req_body (ResolveShortKeysRequest): Request body containing the short keys to resolve.
+        request (Request): The FastAPI request object.
+
+    Returns:
+        ORJSONResponse: Response containing the target URL and active status of every short key.
+    """
+
+    _request_id = request.state.request_id
+
+    # Drop duplicates, keeping the request order
+    short_keys = list(dict.fromkeys(req_body.short_keys))
+
+    with span("db_query"):
+        raw_url_mappings = await run_with_deadline(
+            storage_backend.get_many_by_key(short_keys),
+            config.db_read_timeout_ms
+        )
+
+    annotate(short_keys=len(short_keys), found=len(raw_url_mappings))
+    with span("response_construction"):
+        _response_body = ResolveShortKeysResponse.construct_response(
+            successful=True,
+            request_id=_request_id,
+            message=f"{len(raw_url_mappings)} of {len(short_keys)} short keys found",
+            short_keys=short_keys,
+            url_mappings={url_mapping["short_key"]: url_mapping for url_mapping in raw_url_mappings}
+        )
+        response = ORJSONResponse(status_code=status.HTTP_200_OK, content=_response_body.model_dump())
+
+    return response
 
 
 
@@ -128,24 +255,35 @@ async def redirect_to_target_url(
         HTTPException: Raises a 404 error if the short key is invalid.
     """
 
-    _request_id = request.state.request_id
+    annotate(short_key=short_key)
 
-    logger.info(f"[{_request_id}] query short key {short_key} in UrlMappings")
-    url_mapping = await UrlMappings.find_one(
-        {
-            "short_key": short_key,
-            "is_active": True
-        }
-    )
+    # No mapping exists for a key outside the grammar, when the short key filter did not answer
+    if config.short_key_grammar_enforced and not short_key_grammar.fullmatch(short_key):
+        annotate(outcome="invalid_key")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="invalid short key")
+
+    with span("db_query"):
+        url_mapping = await run_with_deadline(
+            storage_backend.get_by_key(short_key),
+            config.db_read_timeout_ms
+        )
 
-    logger.info(f"[{_request_id}] check if url_mappings exists")
     if url_mapping:
-        logger.info(f"[{_request_id}] update url_mappings hits ({url_mapping.hits})")
-        url_mapping.hits = url_mapping.hits + 1
-        logger.info(f"[{_request_id}] save update to url_mappings")
-        await url_mapping.save()
-        logger.info(f"[{_request_id}] redirecting to target_url {url_mapping.target_url}")
-        return RedirectResponse(url_mapping.target_url)
-
-    logger.info(f"[{_request_id}] url_mappings not found")
+        # Written with the next flush, so a slow write never delays (or fails) the redirect
+        hits_counter.count(short_key)
+        annotate(outcome="redirected", target_url=url_mapping.target_url)
+        with span("response_construction"):
+            response = RedirectResponse(
+                url_mapping.target_url,
+                status_code=url_mapping.redirect_status_code or config.redirect_status_code,
+                headers=redirect_cache_headers(
+                    url_mapping.redirect_cache_max_age
+                    if url_mapping.redirect_cache_max_age is not None
+                    else config.redirect_cache_max_age
+                )
+            )
+        return response
+
+    annotate(outcome="not_found")
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="invalid short key")
+
@@ -3,15 +3,31 @@
 #############
 
 import os
-from typing import Optional
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import SecretStr
+from pydantic import BaseModel, SecretStr, field_validator, model_validator
 
 #########################
 ## define config class ##
 #########################
 
+class ShardSettings(BaseModel):
+    """
+    Location of one UrlMappings shard. Unset fields fall back to the database settings,
+    so a shard with only a name is the default url_mappings collection.
+    """
+
+    # The name of the shard, which places it on the hash ring
+    name: str
+    # The MongoDB URI of the shard's cluster, unset for the default cluster
+    uri: Optional[SecretStr] = None
+    # The name of the shard's database, unset for db_name
+    db_name: Optional[str] = None
+    # The name of the shard's url mappings collection, unset for db_url_mappings_collection_name
+    collection_name: Optional[str] = None
+
+
 class Settings(BaseSettings):
     """
     Configuration settings for the application.
@@ -54,6 +70,30 @@ class Settings(BaseSettings):
     # Whether to include Sentry middleware for error tracking (true/false)
     enforce_sentry_middleware: bool
 
+    # Server config (run.py)
+
+    # The address the server listens on
+    server_host: str = "0.0.0.0"
+    # The port the server listens on
+    server_port: int = 8000
+    # The number of worker processes, 0 starts one per available core
+    server_workers: int = 0
+    # The maximum number of pending connections per worker socket
+    server_backlog: int = 2048
+    # The seconds an idle keep-alive connection is kept open
+    server_keep_alive_timeout: int = 5
+    # The seconds a worker drains its open connections for on shutdown
+    server_graceful_shutdown_timeout: int = 30
+
+    # Storage config
+
+    # The store of url mappings: mongo, or sqlite for an embedded database without MongoDB
+    storage_backend: str = "mongo"
+    # The path of the SQLite database file (sqlite storage backend)
+    sqlite_path: str = "data/url_shortener.db"
+    # How long a sqlite write waits for the write lock of another worker, below db_write_timeout_ms
+    sqlite_busy_timeout_ms: int = 500
+
     # Database config
 
     # The username for accessing the database
@@ -68,6 +108,106 @@ class Settings(BaseSettings):
     db_port: Optional[int] = None
     # Name of the collection that has URL mapping information
     db_url_mappings_collection_name: str
+    # Name of the collection that mirrors idempotent responses (TTL collection)
+    db_idempotency_collection_name: str = "idempotency_records"
+
+    # The shards short keys are spread across by consistent hashing, unsharded when empty
+    db_shards: List[ShardSettings] = []
+    # The shards of the layout being rebalanced from, reads fall back to them until it is done
+    db_shards_previous: List[ShardSettings] = []
+    # The number of points of every shard on the hash ring
+    db_shard_virtual_nodes: int = 64
+    # Name of the collections that route target_url digests to short keys when sharded
+    db_url_mapping_routes_collection_name: str = "url_mapping_routes"
+
+    # The deadline in milliseconds of read operations (maxTimeMS and client side)
+    db_read_timeout_ms: int = 500
+    # The deadline in milliseconds of write operations (client side)
+    db_write_timeout_ms: int = 1000
+    # Whether slow redirect reads are hedged with a second query (true/false)
+    db_hedged_reads_enabled: bool = False
+    # The latency quantile of redirect reads after which a hedge query is sent
+    db_hedge_quantile: float = 0.95
+    # The lowest delay in milliseconds before a hedge query is sent
+    db_hedge_min_delay_ms: float = 5
+    # The read preference of hedge queries, so they reach another replica set member
+    db_hedge_read_preference: str = "secondaryPreferred"
+
+    # Idempotency config
+
+    # Maximum number of idempotent responses kept in the in-process store
+    idempotency_max_entries: int = 10000
+    # Number of seconds an idempotent response is replayed for
+    idempotency_ttl_seconds: int = 86400
+    # Whether idempotent responses are mirrored to the database (true/false)
+    idempotency_mirror_to_db: bool = False
+
+    # Redirect config
+
+    # The status code of redirects, unless a mapping overrides it (301, 302, 307 or 308)
+    redirect_status_code: int = 307
+    # The Cache-Control max-age in seconds of redirects unless a mapping overrides it, 0 sends no-cache
+    redirect_cache_max_age: int = 0
+
+    # How often the hits of redirects, counted in memory, are written in milliseconds (above 0)
+    hits_flush_interval_ms: int = 1000
+
+    # The maximum number of short keys resolved by one POST /resolve request
+    resolve_max_short_keys: int = 1000
+    # Whether redirects are served by the raw ASGI fast lane ahead of FastAPI (true/false)
+    redirect_fast_lane_enabled: bool = False
+
+    # Short key config
+
+    # Whether shorten_url requests must create keys of the short key grammar, and redirects of
+    # keys outside it are answered before any lookup (true/false). Check existing keys first
+    short_key_grammar_enforced: bool = False
+    # The shortest and longest system generated short key a shorten_url request may ask for
+    short_key_min_length: int = 4
+    short_key_max_length: int = 32
+    # The shortest and longest custom key a shorten_url request may provide
+    custom_key_min_length: int = 1
+    custom_key_max_length: int = 64
+    # The characters custom keys may use besides letters and digits
+    custom_key_extra_characters: str = "_-"
+
+    # Admission control config
+
+    # Whether requests are admitted against an adaptive concurrency limit (true/false)
+    admission_control_enabled: bool = False
+    # The number of concurrent requests admitted at startup
+    admission_initial_limit: int = 256
+    # The lowest the concurrency limit can go
+    admission_min_limit: int = 16
+    # The highest the concurrency limit can go
+    admission_max_limit: int = 2048
+    # The database latency in milliseconds above which the concurrency limit is decreased
+    admission_target_latency_ms: float = 50
+    # The factor the concurrency limit is multiplied by when the target latency is exceeded
+    admission_backoff_ratio: float = 0.9
+    # The share of the concurrency limit non redirect requests (e.g. shorten_url) may use
+    admission_low_priority_share: float = 0.5
+    # The Retry-After value in seconds sent with 503 responses
+    admission_retry_after_seconds: int = 1
+    # Whether per client token bucket rate limits are enforced, with or without admission control (true/false)
+    rate_limit_enabled: bool = False
+    # The number of requests per second each client is allowed
+    rate_limit_rate: float = 50
+    # The number of requests a client may burst above its rate
+    rate_limit_burst: int = 100
+
+    # Profiling config
+
+    # Whether requests can be profiled, nothing is checked per request when disabled (true/false)
+    profiling_enabled: bool = False
+    # The value of the x-profile header that requests a profile, empty disables the header
+    profiling_token: SecretStr = SecretStr("")
+    # Profile one request in this many, 0 disables sampling
+    profiling_sample_rate: int = 0
+    # The directory profiles are written to
+    profiling_dump_dir: str = "profiles"
+    # The maximum number of profiles kept, the oldest are removed first
+    profiling_max_dumps: int = 100
 
     # Logging config
 
@@ -85,3 +225,46 @@ class Settings(BaseSettings):
     log_backup_count: int
     # The name of the logger
     log_logger_name: str
+    # The verbosity of the per request summary line (summary or detailed)
+    log_request_verbosity: str = "summary"
+    # The share of successful requests whose summary line is logged, failed ones are always logged
+    log_success_sample_rate: float = 1.0
+
+    @field_validator("storage_backend")
+    @classmethod
+    def validate_storage_backend(cls, value: str) -> str:
+        """
+        Ensures storage_backend names a storage backend.
+        """
+        if value not in ("mongo", "sqlite"):
+            raise ValueError("storage_backend must be mongo or sqlite")
+        return value
+
+    @field_validator("redirect_status_code")
+    @classmethod
+    def validate_redirect_status_code(cls, value: int) -> int:
+        """
+        Ensures redirect_status_code is a redirect status code.
+        """
+        if value not in (301, 302, 307, 308):
+            raise ValueError("redirect_status_code must be 301, 302, 307 or 308")
+        return value
+
+    @field_validator("hits_flush_interval_ms")
+    @classmethod
+    def validate_hits_flush_interval_ms(cls, value: int) -> int:
+        """
+        Ensures hits are written periodically.
+        """
+        if value <= 0:
+            raise ValueError("hits_flush_interval_ms must be above 0")
+        return value
+
+    @model_validator(mode="after")
+    def validate_sqlite_busy_timeout(self) -> "Settings":
+        """
+        Ensures a sqlite write gives up waiting for the write lock before its deadline.
+        """
+        if self.sqlite_busy_timeout_ms >= self.db_write_timeout_ms:
+            raise ValueError("sqlite_busy_timeout_ms must be below db_write_timeout_ms")
+        return self
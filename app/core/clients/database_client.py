@@ -2,9 +2,45 @@
 ## Imports ##
 #############
 
-from typing import List
+import asyncio
+import hashlib
+from typing import Dict, List, NamedTuple, Optional
 from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.config import ShardSettings
+from app.core.clients.hash_ring import HashRing
+
+
+# Indexes of every url mappings collection, the ones of the UrlMappings model
+URL_MAPPINGS_INDEXES = [
+    IndexModel([("short_key", 1)], unique=True),
+    IndexModel([("target_url", 1), ("is_active", 1)]),
+]
+
+# Indexes of every url mapping routes collection
+URL_MAPPING_ROUTES_INDEXES = [
+    IndexModel([("target_digest", 1), ("is_active", 1)]),
+]
+
+
+def target_digest(target_url: str) -> str:
+    """
+    Returns the digest of a target_url, which routes its dedupe lookups.
+    """
+    return hashlib.sha256(target_url.encode()).hexdigest()
+
+
+class Shard(NamedTuple):
+    """
+    The collections of one UrlMappings shard.
+    """
+
+    name: str
+    url_mappings: AsyncIOMotorCollection
+    url_mapping_routes: AsyncIOMotorCollection
 
 
 ####################
@@ -15,6 +51,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 class DatabaseClient:
     """
     A client for connecting to MongoDB and initializing Beanie for document models.
+
+    UrlMappings can be spread across shards (clusters, databases or collections), each
+    short key living on the shard a consistent hash ring assigns it. Since a target_url
+    cannot be hashed to its short key, sharded dedupe lookups go through a route record
+    (target_url digest -> short key) stored on the shard the digest hashes to.
+
+    While a rebalance is in progress (previous_shards set), writes go to the new layout
+    and reads fall back to the previous one until rebalance_shards.py has moved the data.
     """
 
     def __init__(
@@ -23,7 +67,13 @@ class DatabaseClient:
         db_password: str,
         db_host: str,
         db_port: int,
-        db_name: str
+        db_name: str,
+        url_mappings_collection_name: str = "url_mappings",
+        url_mapping_routes_collection_name: str = "url_mapping_routes",
+        shards: Optional[List[ShardSettings]] = None,
+        previous_shards: Optional[List[ShardSettings]] = None,
+        virtual_nodes: int = 64,
+        event_listeners: Optional[List] = None
     ) -> None:
         """
         Initializes the DatabaseClient with MongoDB connection details.
@@ -34,24 +84,260 @@ class DatabaseClient:
             db_host (str): The MongoDB host address.
             db_port (int): The MongoDB port.
             db_name (str): The name of the MongoDB database.
+            url_mappings_collection_name (str): The default name of url mappings collections.
+            url_mapping_routes_collection_name (str): The name of url mapping routes collections.
+            shards (Optional[List[ShardSettings]]): The shards of UrlMappings, unsharded if empty.
+            previous_shards (Optional[List[ShardSettings]]): The shards of the layout being
+                                                             rebalanced from, if any.
+            virtual_nodes (int): The number of points of every shard on the hash ring.
+            event_listeners (Optional[List]): pymongo monitoring listeners registered on the clients.
         """
         self.db_username = db_username
         self.db_password = db_password
         self.db_host = db_host
         self.db_port = db_port
         self.db_name = db_name
+        self.url_mappings_collection_name = url_mappings_collection_name
+        self.url_mapping_routes_collection_name = url_mapping_routes_collection_name
+        self.event_listeners = event_listeners or []
 
         # Connect to MongoDB using Motor async client
 
         if not self.db_port:
             self.client = AsyncIOMotorClient(
-                f"mongodb://{self.db_username}:{self.db_password}@{self.db_host}:{self.db_port}"
+                f"mongodb://{self.db_username}:{self.db_password}@{self.db_host}:{self.db_port}",
+                event_listeners=self.event_listeners
             )
         else:
             self.client = AsyncIOMotorClient(
-                f"mongodb+srv://{self.db_username}:{self.db_password}@{self.db_host}"
+                f"mongodb+srv://{self.db_username}:{self.db_password}@{self.db_host}",
+                event_listeners=self.event_listeners
             )
 
+        # Shard clients by URI and shards by location, so both layouts share them
+        self._shard_clients: Dict[str, AsyncIOMotorClient] = {}
+        self._shards_by_location: Dict[tuple, Shard] = {}
+        # Shards in the same database share its routes collection
+        self._routes_collections: Dict[tuple, AsyncIOMotorCollection] = {}
+
+        self.sharded = bool(shards)
+        self.shards = self._build_layout(shards or [ShardSettings(name="default")])
+        self.ring = HashRing(list(self.shards), virtual_nodes)
+
+        self.previous_shards = self._build_layout(previous_shards or [])
+        self.previous_ring = HashRing(list(self.previous_shards), virtual_nodes) if self.previous_shards else None
+
+    def _build_layout(self, shard_settings: List[ShardSettings]) -> Dict[str, Shard]:
+        """
+        Builds the shards of a layout by name.
+        """
+        layout = {}
+        locations = set()
+        for settings in shard_settings:
+            uri = settings.uri.get_secret_value() if settings.uri else None
+            location = (
+                uri,
+                settings.db_name or self.db_name,
+                settings.collection_name or self.url_mappings_collection_name,
+            )
+            if settings.name in layout or location in locations:
+                raise ValueError(f"shard {settings.name} is configured twice")
+            locations.add(location)
+
+            if location not in self._shards_by_location:
+                client = self.client
+                if uri:
+                    if uri not in self._shard_clients:
+                        self._shard_clients[uri] = AsyncIOMotorClient(uri, event_listeners=self.event_listeners)
+                    client = self._shard_clients[uri]
+                database = client[location[1]]
+                if location[:2] not in self._routes_collections:
+                    self._routes_collections[location[:2]] = database[self.url_mapping_routes_collection_name]
+                self._shards_by_location[location] = Shard(
+                    name=settings.name,
+                    url_mappings=database[location[2]],
+                    url_mapping_routes=self._routes_collections[location[:2]],
+                )
+            layout[settings.name] = self._shards_by_location[location]
+        return layout
+
+    def owners(self, key: str) -> List[Shard]:
+        """
+        Returns the shard a key belongs to, followed by its shard in the previous layout
+        if a rebalance is in progress and it differs.
+
+        Args:
+            key (str): A short key, or a target_url digest.
+        """
+        owners = [self.shards[self.ring.node_for(key)]]
+        if self.previous_ring is not None:
+            previous_owner = self.previous_shards[self.previous_ring.node_for(key)]
+            if previous_owner is not owners[0]:
+                owners.append(previous_owner)
+        return owners
+
+    def all_shards(self) -> List[Shard]:
+        """
+        Returns every shard of the current and previous layouts once.
+        """
+        return list({id(shard): shard for shard in [*self.shards.values(), *self.previous_shards.values()]}.values())
+
+    def url_mappings_collections(self, short_key: str) -> List[AsyncIOMotorCollection]:
+        """
+        Returns the url mappings collections a short key is looked up in, in order.
+        """
+        return [shard.url_mappings for shard in self.owners(short_key)]
+
+    async def find_url_mapping_by_target(self, target_url: str, max_time_ms: Optional[int] = None) -> Optional[dict]:
+        """
+        Finds the active raw url mapping of a target_url.
+
+        Args:
+            target_url (str): The target URL.
+            max_time_ms (Optional[int]): The server side deadline of each query.
+
+        Returns:
+            Optional[dict]: The raw url mapping, None if the target_url has none.
+        """
+        # Collections queried by target_url, the single one when unsharded
+        collections = [] if self.sharded else [self.shards["default"].url_mappings]
+
+        if self.sharded:
+            digest = target_digest(target_url)
+            for shard in self.owners(digest):
+                route = await shard.url_mapping_routes.find_one(
+                    {"target_digest": digest, "is_active": True},
+                    projection={"_id": 0, "short_key": 1},
+                    max_time_ms=max_time_ms,
+                )
+                if route:
+                    for collection in self.url_mappings_collections(route["short_key"]):
+                        url_mapping = await collection.find_one(
+                            {"short_key": route["short_key"], "is_active": True}, max_time_ms=max_time_ms
+                        )
+                        if url_mapping:
+                            return url_mapping
+
+        # Mappings of a previous layout may not have their route yet
+        collections.extend(
+            shard.url_mappings for shard in self.previous_shards.values()
+            if shard.url_mappings not in collections
+        )
+        for collection in collections:
+            url_mapping = await collection.find_one(
+                {"target_url": target_url, "is_active": True}, max_time_ms=max_time_ms
+            )
+            if url_mapping:
+                return url_mapping
+        return None
+
+    async def find_url_mappings(
+        self,
+        short_keys: List[str],
+        projection: Optional[dict] = None,
+        max_time_ms: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Finds the raw url mappings of many short keys, with one query per shard.
+
+        Args:
+            short_keys (List[str]): The short keys.
+            projection (Optional[dict]): The projection of the returned documents.
+            max_time_ms (Optional[int]): The server side deadline of each query.
+
+        Returns:
+            List[dict]: The raw url mappings found, in no particular order.
+        """
+        url_mappings = []
+        missing = list(short_keys)
+        for attempt in range(2 if self.previous_ring is not None else 1):
+            keys_by_shard: Dict[int, List[str]] = {}
+            shards: Dict[int, Shard] = {}
+            for short_key in missing:
+                owners = self.owners(short_key)
+                if attempt < len(owners):
+                    shard = owners[attempt]
+                    keys_by_shard.setdefault(id(shard), []).append(short_key)
+                    shards[id(shard)] = shard
+
+            results = await asyncio.gather(*(
+                shards[shard_id].url_mappings.find(
+                    {"short_key": {"$in": keys}}, projection=projection, max_time_ms=max_time_ms
+                ).to_list(None)
+                for shard_id, keys in keys_by_shard.items()
+            ))
+            found = {url_mapping["short_key"] for result in results for url_mapping in result}
+            url_mappings.extend(url_mapping for result in results for url_mapping in result)
+            missing = [short_key for short_key in missing if short_key not in found]
+        return url_mappings
+
+    async def insert_url_mapping(self, document: dict) -> None:
+        """
+        Inserts a raw url mapping on its shard (setting its _id), and its route when sharded.
+
+        Args:
+            document (dict): The raw url mapping.
+
+        Raises:
+            DuplicateKeyError: If the short key is already taken.
+        """
+        owners = self.owners(document["short_key"])
+        # A short key not moved yet is only unique on its previous shard
+        for shard in owners[1:]:
+            if await shard.url_mappings.find_one({"short_key": document["short_key"]}, projection={"_id": 1}):
+                raise DuplicateKeyError(f"short key {document['short_key']} already exists")
+
+        await owners[0].url_mappings.insert_one(document)
+
+        if self.sharded:
+            digest = target_digest(document["target_url"])
+            await self.owners(digest)[0].url_mapping_routes.insert_one({
+                "target_digest": digest,
+                "target_url": document["target_url"],
+                "short_key": document["short_key"],
+                "is_active": document.get("is_active", True),
+            })
+
+    async def increment_hits(self, hits: Dict[str, int]) -> None:
+        """
+        Adds hits to the active url mappings of many short keys, with one bulk write per shard.
+
+        Args:
+            hits (Dict[str, int]): The number of hits to add, by short key.
+        """
+        if self.previous_ring is not None:
+            # While rebalancing, a short key not moved yet is counted on its previous shard
+            for short_key, count in hits.items():
+                for collection in self.url_mappings_collections(short_key):
+                    result = await collection.update_one(
+                        {"short_key": short_key, "is_active": True}, {"$inc": {"hits": count}}
+                    )
+                    if result.matched_count:
+                        break
+            return
+
+        operations_by_shard: Dict[int, List[UpdateOne]] = {}
+        shards: Dict[int, Shard] = {}
+        for short_key, count in hits.items():
+            shard = self.owners(short_key)[0]
+            operations_by_shard.setdefault(id(shard), []).append(
+                UpdateOne({"short_key": short_key, "is_active": True}, {"$inc": {"hits": count}})
+            )
+            shards[id(shard)] = shard
+
+        await asyncio.gather(*(
+            shards[shard_id].url_mappings.bulk_write(operations, ordered=False)
+            for shard_id, operations in operations_by_shard.items()
+        ))
+
+    async def create_shard_indexes(self) -> None:
+        """
+        Creates the indexes of the url mappings (and routes) collections of every shard.
+        """
+        for shard in self.all_shards():
+            await shard.url_mappings.create_indexes(URL_MAPPINGS_INDEXES)
+            if self.sharded:
+                await shard.url_mapping_routes.create_indexes(URL_MAPPING_ROUTES_INDEXES)
 
     async def connect(self, document_models: List) -> None:
         """
@@ -62,9 +348,12 @@ class DatabaseClient:
         """
 
         await init_beanie(database=self.client[self.db_name], document_models=document_models)
+        await self.create_shard_indexes()
 
     async def disconnect(self) -> None:
         """
         Disconnects from the MongoDB database.
         """
         self.client.close()
+        for client in self._shard_clients.values():
+            client.close()
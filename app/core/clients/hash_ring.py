@@ -0,0 +1,88 @@
+#############
+## Imports ##
+#############
+
+import hashlib
+from bisect import bisect_left
+from typing import List, Tuple
+
+
+##############
+## HashRing ##
+##############
+
+# Size of the hash space, hashes are 64 bit integers
+HASH_SPACE = 2 ** 64
+
+
+def hash_key(key: str) -> int:
+    """
+    Hashes a key to a point of the ring.
+
+    Args:
+        key (str): The key to hash (e.g. a short key or a target_url digest).
+
+    Returns:
+        int: The 64 bit hash of the key.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring placing every node at virtual_nodes points. A key belongs to the
+    node of the first point at or after its hash, so adding or removing a node only moves
+    the keys of the ranges next to its points.
+    """
+
+    def __init__(self, nodes: List[str], virtual_nodes: int = 64) -> None:
+        """
+        Initializes the HashRing.
+
+        Args:
+            nodes (List[str]): The names of the nodes.
+            virtual_nodes (int): The number of points of every node on the ring.
+        """
+        if not nodes:
+            raise ValueError("a hash ring needs at least one node")
+
+        points = sorted(
+            (hash_key(f"{node}#{index}"), node)
+            for node in nodes
+            for index in range(virtual_nodes)
+        )
+        self.nodes = list(nodes)
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """
+        Returns the node a key belongs to.
+        """
+        return self._node_at(hash_key(key))
+
+    def _node_at(self, point: int) -> str:
+        """
+        Returns the node of the first point at or after a hash.
+        """
+        return self._nodes[bisect_left(self._hashes, point) % len(self._hashes)]
+
+    def moved_ranges(self, other: "HashRing") -> List[Tuple[int, int, str, str]]:
+        """
+        Returns the ranges of the hash space that belong to a different node on another ring.
+
+        Args:
+            other (HashRing): The ring keys move to.
+
+        Returns:
+            List[Tuple[int, int, str, str]]: The (start, end, node, other node) of every moved
+                                             range, keys with start < hash <= end move.
+        """
+        boundaries = sorted(set(self._hashes) | set(other._hashes))
+        moved = []
+        # Every range between two consecutive boundaries belongs to one node on each ring
+        for start, end in zip([boundaries[-1] - HASH_SPACE] + boundaries[:-1], boundaries):
+            node, other_node = self._node_at(end), other._node_at(end)
+            if node != other_node:
+                moved.append((start, end, node, other_node))
+        return moved
@@ -0,0 +1,158 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+
+##################
+## HedgedReader ##
+##################
+
+
+class HedgedReader:
+    """
+    Runs find_one queries, and when a query has not returned after the p95 (by default)
+    of recently observed latencies, sends the same query with a read preference that
+    targets another replica set member and uses whichever answer arrives first.
+
+    A hedge that finds nothing is not trusted on its own, since the member it reached
+    may lag behind; the original query is awaited in that case. The original query is
+    not cancelled when the hedge wins, so its latency still counts towards the quantile
+    (it is bounded by its server side deadline).
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        quantile: float = 0.95,
+        min_delay_ms: float = 5,
+        read_preference: str = "secondaryPreferred",
+        window_size: int = 1024,
+        refresh_every: int = 64,
+    ) -> None:
+        """
+        Initializes the HedgedReader.
+
+        Args:
+            enabled (bool): Whether queries are hedged at all.
+            quantile (float): The latency quantile after which a query is hedged.
+            min_delay_ms (float): The lowest hedge delay, so fast periods do not hedge everything.
+            read_preference (str): The read preference of hedge queries.
+            window_size (int): The number of recent latencies the quantile is computed from.
+            refresh_every (int): The number of observations between quantile computations.
+        """
+        self.enabled = enabled
+        self.quantile = quantile
+        self.min_delay = min_delay_ms / 1000
+        self.read_preference = make_read_preference(read_pref_mode_from_name(read_preference), None)
+        self.refresh_every = refresh_every
+
+        self.hedge_delay = self.min_delay
+        self.queries = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+        self._observations = 0
+        self._latencies = deque(maxlen=window_size)
+
+    async def find_one(
+        self,
+        collection,
+        filter: dict,
+        max_time_ms: Optional[int] = None,
+        projection: Optional[dict] = None,
+    ) -> Optional[dict]:
+        """
+        Finds one raw document, hedging the query if it is slow.
+
+        Args:
+            collection: The motor collection to query.
+            filter (dict): The query filter.
+            max_time_ms (Optional[int]): The server side deadline of each query.
+            projection (Optional[dict]): The fields returned, all of them if None.
+
+        Returns:
+            Optional[dict]: The raw document, None if no document matches.
+        """
+        self.queries += 1
+        if not self.enabled:
+            return await collection.find_one(filter, projection, max_time_ms=max_time_ms)
+
+        started_at = time.monotonic()
+
+        def observe(task: asyncio.Future) -> None:
+            # The original query is left running when the hedge wins, so its real latency,
+            # slow ones included, is recorded whenever it completes
+            if not task.cancelled():
+                task.exception()
+                self._observe(time.monotonic() - started_at)
+
+        primary = asyncio.ensure_future(collection.find_one(filter, projection, max_time_ms=max_time_ms))
+        primary.add_done_callback(observe)
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        self.hedges_fired += 1
+        hedge = asyncio.ensure_future(
+            collection.with_options(read_preference=self.read_preference).find_one(
+                filter, projection, max_time_ms=max_time_ms
+            )
+        )
+
+        try:
+            done, _ = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+
+            if primary in done and not primary.exception():
+                return primary.result()
+
+            if hedge in done and not hedge.exception() and hedge.result() is not None:
+                self.hedges_won += 1
+                return hedge.result()
+
+            if primary in done:
+                # The original query failed, the hedge answers alone
+                result = await hedge
+                self.hedges_won += 1
+                return result
+
+            # The hedge failed or missed, the original query stays authoritative
+            return await primary
+        finally:
+            if not hedge.done():
+                hedge.cancel()
+            elif not hedge.cancelled():
+                hedge.exception()
+
+    def _observe(self, latency: float) -> None:
+        """
+        Records the latency of an original query, hedged or not, and periodically
+        recomputes the hedge delay.
+        """
+        self._latencies.append(latency)
+        self._observations += 1
+        if self._observations % self.refresh_every == 0:
+            ordered = sorted(self._latencies)
+            self.hedge_delay = max(
+                self.min_delay,
+                ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+            )
+
+    def stats(self) -> dict:
+        """
+        Returns the hedging counters.
+        """
+        return {
+            "enabled": self.enabled,
+            "hedge_delay_ms": round(self.hedge_delay * 1000, 3),
+            "queries": self.queries,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
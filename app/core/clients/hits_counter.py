@@ -0,0 +1,114 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional
+
+from app.core.storage.storage_backend import StorageBackend
+
+
+#################
+## HitsCounter ##
+#################
+
+
+class HitsCounter:
+    """
+    Counts the hits of redirects in memory and writes them every flush_interval_ms with
+    one StorageBackend.increment_hits call, so a redirect never waits for (or fails on) a
+    hits write, and the database gets at most one hits write in flight per worker however
+    many redirects are served.
+
+    Counting is best effort: the hits of a flush that fails or passes its deadline are
+    dropped rather than retried (a timed out write may have been applied), and hits not
+    yet written are lost if the worker crashes. Pending hits are written on stop.
+    """
+
+    def __init__(self, storage_backend: StorageBackend, flush_interval_ms: int, write_timeout_ms: int, logger=None) -> None:
+        """
+        Initializes the HitsCounter.
+
+        Args:
+            storage_backend (StorageBackend): The store hits are written to.
+            flush_interval_ms (int): How often counted hits are written.
+            write_timeout_ms (int): The client side deadline of every write.
+            logger (Rotolog): The logger failed writes are reported to, if any.
+        """
+        self.storage_backend = storage_backend
+        self.flush_interval = flush_interval_ms / 1000
+        self.write_timeout = write_timeout_ms / 1000
+        self.logger = logger
+
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped_hits = 0
+
+        self._pending_hits: Dict[str, int] = defaultdict(int)
+        self._closing: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def count(self, short_key: str) -> None:
+        """
+        Counts a hit of a short key, written with the next flush.
+        """
+        self._pending_hits[short_key] += 1
+
+    async def start(self) -> None:
+        """
+        Starts writing counted hits periodically, called once the storage backend is open.
+        """
+        self._closing = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """
+        Writes the pending hits and stops, called before the storage backend is closed.
+        """
+        if self._flush_task is None:
+            return
+        self._closing.set()
+        await self._flush_task
+        self._flush_task = None
+
+    async def flush(self) -> None:
+        """
+        Writes the hits counted since the last flush.
+        """
+        pending_hits, self._pending_hits = self._pending_hits, defaultdict(int)
+        if not pending_hits:
+            return
+
+        self.flushes += 1
+        try:
+            await asyncio.wait_for(self.storage_backend.increment_hits(pending_hits), self.write_timeout)
+        except Exception as e:
+            self.failed_flushes += 1
+            self.dropped_hits += sum(pending_hits.values())
+            if self.logger is not None:
+                self.logger.error(f"hits write of {len(pending_hits)} short keys failed: {e!r}")
+
+    async def _flush_periodically(self) -> None:
+        """
+        Writes the counted hits every flush_interval_ms, and once more on stop.
+        """
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+        # Stopped before the loop ran, or hits were counted during the last flush
+        await self.flush()
+
+    def stats(self) -> dict:
+        """
+        Returns the hits counters.
+        """
+        return {
+            "pending_short_keys": len(self._pending_hits),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped_hits": self.dropped_hits,
+        }
@@ -0,0 +1,158 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.models.models import IdempotencyRecords
+
+
+#######################
+## IdempotencyClient ##
+#######################
+
+
+class StoredResponse(NamedTuple):
+    """
+    A response stored against an idempotency key.
+    """
+    fingerprint: str  # Digest of the request that produced the response
+    status_code: int  # HTTP status code of the response
+    body: dict  # JSON body of the response
+    expires_at: float  # Monotonic time after which the response is no longer replayed
+
+
+class IdempotencyClient:
+    """
+    A bounded in-process store of responses keyed by Idempotency-Key, optionally
+    mirrored to a MongoDB TTL collection so that replays survive restarts and are
+    shared between instances.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, mirror_to_db: bool = False) -> None:
+        """
+        Initializes the IdempotencyClient.
+
+        Args:
+            max_entries (int): The maximum number of responses kept in memory,
+                               the least recently used response is evicted first.
+            ttl_seconds (int): The number of seconds a response is replayed for.
+            mirror_to_db (bool): Whether responses are also stored in IdempotencyRecords.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.mirror_to_db = mirror_to_db
+
+        self._responses: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def lock(self, idempotency_key: str) -> AsyncIterator[None]:
+        """
+        Serializes concurrent requests carrying the same idempotency key, so a retry
+        that arrives while the first attempt is still running waits for its response
+        instead of repeating the work.
+
+        Args:
+            idempotency_key (str): The client supplied idempotency key.
+        """
+        _lock = self._locks.setdefault(idempotency_key, asyncio.Lock())
+        self._waiters[idempotency_key] = self._waiters.get(idempotency_key, 0) + 1
+        try:
+            async with _lock:
+                yield
+        finally:
+            self._waiters[idempotency_key] -= 1
+            if not self._waiters[idempotency_key]:
+                del self._waiters[idempotency_key]
+                del self._locks[idempotency_key]
+
+    async def get(self, idempotency_key: str) -> Optional[StoredResponse]:
+        """
+        Returns the response stored against an idempotency key.
+
+        Args:
+            idempotency_key (str): The client supplied idempotency key.
+
+        Returns:
+            Optional[StoredResponse]: The stored response, None if there is no live response.
+        """
+        stored_response = self._responses.get(idempotency_key)
+        if stored_response:
+            if stored_response.expires_at > time.monotonic():
+                self._responses.move_to_end(idempotency_key)
+                return stored_response
+            del self._responses[idempotency_key]
+
+        if not self.mirror_to_db:
+            return None
+
+        record = await IdempotencyRecords.find_one({"idempotency_key": idempotency_key})
+        if not record:
+            return None
+
+        # Mongo removes expired documents in the background, so check the age as well
+        remaining_seconds = (
+            record.create_date + timedelta(seconds=self.ttl_seconds) - datetime.utcnow()
+        ).total_seconds()
+        if remaining_seconds <= 0:
+            return None
+
+        stored_response = StoredResponse(
+            fingerprint=record.fingerprint,
+            status_code=record.status_code,
+            body=record.body,
+            expires_at=time.monotonic() + remaining_seconds,
+        )
+        self._remember(idempotency_key, stored_response)
+        return stored_response
+
+    async def put(self, idempotency_key: str, fingerprint: str, status_code: int, body: dict) -> None:
+        """
+        Stores a response against an idempotency key.
+
+        Args:
+            idempotency_key (str): The client supplied idempotency key.
+            fingerprint (str): Digest of the request that produced the response.
+            status_code (int): HTTP status code of the response.
+            body (dict): JSON body of the response.
+        """
+        self._remember(
+            idempotency_key,
+            StoredResponse(
+                fingerprint=fingerprint,
+                status_code=status_code,
+                body=body,
+                expires_at=time.monotonic() + self.ttl_seconds,
+            )
+        )
+
+        if self.mirror_to_db:
+            try:
+                await IdempotencyRecords(
+                    idempotency_key=idempotency_key,
+                    fingerprint=fingerprint,
+                    status_code=status_code,
+                    body=body,
+                ).insert()
+            except DuplicateKeyError:
+                # Another instance stored the first response already
+                pass
+
+    def _remember(self, idempotency_key: str, stored_response: StoredResponse) -> None:
+        """
+        Adds a response to the in-process store, evicting the least recently used
+        responses once max_entries is exceeded.
+        """
+        self._responses[idempotency_key] = stored_response
+        self._responses.move_to_end(idempotency_key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
@@ -0,0 +1,198 @@
+#############
+## Imports ##
+#############
+
+from typing import Dict, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.clients.database_client import DatabaseClient, Shard, target_digest
+from app.core.clients.hash_ring import HASH_SPACE
+
+
+#####################
+## ShardRebalancer ##
+#####################
+
+
+class ShardRebalancer:
+    """
+    Moves url mappings (and their routes) to the shards the current layout assigns them,
+    while the app keeps serving from both layouts (see DatabaseClient).
+
+    Documents are moved one at a time: copied to their new shard, then removed from the
+    old one, with the hits counted on the old shard in between added to the copy. A run
+    can be interrupted and started again.
+
+    A document whose key the target shard already holds under another _id (e.g. the same
+    custom key created on both layouts) is a conflict: it is left on its shard and
+    reported, for an operator to resolve, and the run goes on.
+    """
+
+    def __init__(self, database_client: DatabaseClient, batch_size: int = 500, logger=None) -> None:
+        """
+        Initializes the ShardRebalancer.
+
+        Args:
+            database_client (DatabaseClient): The client holding the current and previous layouts.
+            batch_size (int): The number of documents read from a shard per batch.
+            logger (Rotolog): The logger progress is reported to, if any.
+        """
+        self.database_client = database_client
+        self.batch_size = batch_size
+        self.logger = logger
+
+    def _log(self, message: str) -> None:
+        if self.logger is not None:
+            self.logger.info(message)
+
+    def moved_share(self) -> float:
+        """
+        Returns the share of the hash space whose shard differs between the previous
+        and the current layout, 0 if no rebalance is in progress.
+        """
+        previous_ring = self.database_client.previous_ring
+        if previous_ring is None:
+            return 0.0
+        moved_ranges = previous_ring.moved_ranges(self.database_client.ring)
+        return sum(end - start for start, end, _, _ in moved_ranges) / HASH_SPACE
+
+    async def run(self, backfill_routes: bool = True) -> Dict[str, int]:
+        """
+        Moves every misplaced url mapping and route, then (when sharded) creates the
+        missing routes of the url mappings, e.g. the ones of an unsharded layout.
+
+        Args:
+            backfill_routes (bool): Whether missing routes are created.
+
+        Returns:
+            Dict[str, int]: The number of url mappings moved, routes moved, routes created and
+                            conflicts left in place.
+        """
+        await self.database_client.create_shard_indexes()
+        self._log(f"rebalancing {self.moved_share():.1%} of the hash space")
+
+        result = {"url_mappings_moved": 0, "routes_moved": 0, "routes_created": 0, "conflicts": 0}
+
+        for shard in self.database_client.all_shards():
+            moved, conflicts = await self._move_misplaced(
+                shard, shard.url_mappings, "url_mappings", key_field="short_key", counter_field="hits"
+            )
+            result["url_mappings_moved"] += moved
+            result["conflicts"] += conflicts
+            if self.database_client.sharded:
+                moved, conflicts = await self._move_misplaced(
+                    shard, shard.url_mapping_routes, "url_mapping_routes", key_field="target_digest"
+                )
+                result["routes_moved"] += moved
+                result["conflicts"] += conflicts
+
+        if self.database_client.sharded and backfill_routes:
+            for shard in self.database_client.shards.values():
+                result["routes_created"] += await self._backfill_routes(shard)
+
+        self._log(f"rebalance done {result}")
+        return result
+
+    async def _move_misplaced(
+        self,
+        shard: Shard,
+        collection: AsyncIOMotorCollection,
+        collection_kind: str,
+        key_field: str,
+        counter_field: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """
+        Moves the documents of a shard's collection that belong to another shard.
+
+        Returns:
+            Tuple[int, int]: The number of documents moved, and of conflicts left in place.
+        """
+        moved = 0
+        conflicts = 0
+        cursor = collection.find({}, projection={key_field: 1}).batch_size(self.batch_size)
+        async for document in cursor:
+            owner = self.database_client.owners(document[key_field])[0]
+            target = getattr(owner, collection_kind)
+            # Shards in the same database share their routes collection
+            if owner is shard or target is collection:
+                continue
+
+            try:
+                if not await self._move(collection, target, document["_id"], counter_field):
+                    continue
+            except DuplicateKeyError:
+                conflicts += 1
+                self._log(
+                    f"conflict: {collection_kind} {key_field}={document[key_field]} of shard {shard.name} "
+                    f"already exists on shard {owner.name} under another _id, left in place"
+                )
+                continue
+
+            moved += 1
+            if moved % self.batch_size == 0:
+                self._log(f"moved {moved} {collection_kind} from shard {shard.name}")
+        return moved, conflicts
+
+    @staticmethod
+    async def _move(
+        source: AsyncIOMotorCollection,
+        target: AsyncIOMotorCollection,
+        _id,
+        counter_field: Optional[str] = None,
+    ) -> bool:
+        """
+        Moves one document: copies it to the target (unless a previous run did), removes
+        it from the source, then adds to the copy the count the source gained meanwhile.
+
+        Returns:
+            bool: Whether the document was moved, False if another process moved it first.
+
+        Raises:
+            DuplicateKeyError: If the target holds the document's key under another _id,
+                               the document is then left on the source.
+        """
+        document = await source.find_one({"_id": _id})
+        if document is None:
+            return False
+
+        copy = {field: value for field, value in document.items() if field != "_id"}
+        # The copy of an interrupted run is kept, and the count is carried over from it
+        previous_copy = await target.find_one_and_update(
+            {"_id": _id}, {"$setOnInsert": copy}, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+        copied = previous_copy if previous_copy is not None else document
+
+        removed = await source.find_one_and_delete({"_id": _id})
+        if removed is None:
+            return False
+
+        if counter_field:
+            gained = removed.get(counter_field, 0) - copied.get(counter_field, 0)
+            if gained:
+                await target.update_one({"_id": _id}, {"$inc": {counter_field: gained}})
+        return True
+
+    async def _backfill_routes(self, shard: Shard) -> int:
+        """
+        Creates the missing routes of the active url mappings of a shard.
+
+        Returns:
+            int: The number of routes created.
+        """
+        created = 0
+        cursor = shard.url_mappings.find(
+            {"is_active": True}, projection={"_id": 0, "short_key": 1, "target_url": 1}
+        ).batch_size(self.batch_size)
+        async for url_mapping in cursor:
+            digest = target_digest(url_mapping["target_url"])
+            result = await self.database_client.owners(digest)[0].url_mapping_routes.update_one(
+                {"target_digest": digest, "short_key": url_mapping["short_key"]},
+                {"$setOnInsert": {"target_url": url_mapping["target_url"], "is_active": True}},
+                upsert=True,
+            )
+            if result.upserted_id is not None:
+                created += 1
+        return created
@@ -0,0 +1,287 @@
+#############
+## Imports ##
+#############
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from uuid import uuid4
+
+import orjson
+from pymongo import monitoring
+
+from app.core.schema.response_schema import ErrorResponse
+
+
+##############################
+## AdaptiveConcurrencyLimit ##
+##############################
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    A concurrency limit adjusted with AIMD (additive increase, multiplicative decrease)
+    from the observed database latency.
+
+    While the smoothed latency stays under the target and the limit is being used, the
+    limit grows by roughly one slot per limit-sized batch of observations. Once the
+    smoothed latency goes over the target, the limit is multiplied by backoff_ratio, at
+    most once per cooldown so that a single slow batch does not collapse it.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency_ms: float,
+        backoff_ratio: float = 0.9,
+        smoothing: float = 0.2,
+        low_priority_share: float = 0.5,
+    ) -> None:
+        """
+        Initializes the AdaptiveConcurrencyLimit.
+
+        Args:
+            initial_limit (int): The number of concurrent requests admitted at startup.
+            min_limit (int): The limit never drops below this value.
+            max_limit (int): The limit never grows above this value.
+            target_latency_ms (float): The database latency above which the limit is decreased.
+            backoff_ratio (float): The factor the limit is multiplied by on a decrease.
+            smoothing (float): The weight of a new observation in the latency moving average.
+            low_priority_share (float): The share of the limit low priority requests may use.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency_ms / 1000
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.low_priority_share = low_priority_share
+
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.smoothed_latency = 0.0
+        self.rejected = 0
+
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, high_priority: bool) -> bool:
+        """
+        Admits a request if there is capacity left for its priority.
+
+        Args:
+            high_priority (bool): Whether the request may use the whole limit.
+
+        Returns:
+            bool: True if the request was admitted and has to call release(), False otherwise.
+        """
+        _limit = self.limit if high_priority else self.limit * self.low_priority_share
+        if self.in_flight >= max(_limit, 1):
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        """
+        Releases the slot of an admitted request.
+        """
+        self.in_flight -= 1
+
+    def observe_latency(self, latency: float) -> None:
+        """
+        Adjusts the limit from the latency of a database operation. It is called from the
+        threads that run database operations, hence the lock.
+
+        Args:
+            latency (float): The latency of the operation in seconds.
+        """
+        with self._lock:
+            self.smoothed_latency += self.smoothing * (latency - self.smoothed_latency)
+            now = time.monotonic()
+
+            if self.smoothed_latency > self.target_latency:
+                if now - self._last_decrease >= max(self.smoothed_latency, self.target_latency):
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                    self._last_decrease = now
+            elif self.in_flight >= self.limit * self.low_priority_share:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        """
+        Returns the current state of the limit.
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "smoothed_latency_ms": round(self.smoothed_latency * 1000, 3),
+            "rejected": self.rejected,
+        }
+
+
+class DatabaseLatencyListener(monitoring.CommandListener):
+    """
+    A pymongo command listener feeding the duration of every database command
+    to an AdaptiveConcurrencyLimit.
+    """
+
+    def __init__(self, concurrency_limit: AdaptiveConcurrencyLimit) -> None:
+        self.concurrency_limit = concurrency_limit
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.concurrency_limit.observe_latency(event.duration_micros / 1_000_000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        # Failed commands (timeouts included) are a latency signal as well
+        self.concurrency_limit.observe_latency(event.duration_micros / 1_000_000)
+
+
+############################
+## TokenBucketRateLimiter ##
+############################
+
+
+class TokenBucketRateLimiter:
+    """
+    Per client token buckets. Buckets of the least recently seen clients are dropped
+    once max_clients is exceeded, a dropped client starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 100000) -> None:
+        """
+        Initializes the TokenBucketRateLimiter.
+
+        Args:
+            rate (float): The number of requests per second refilled into each bucket.
+            burst (int): The capacity of each bucket.
+            max_clients (int): The maximum number of buckets kept in memory.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.rejected = 0
+
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def allow(self, client: str) -> Tuple[bool, float]:
+        """
+        Takes a token from the bucket of a client.
+
+        Args:
+            client (str): The client identifier (host address).
+
+        Returns:
+            Tuple[bool, float]: Whether the request is allowed, and if not the number
+                                of seconds until a token is available.
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.rejected += 1
+
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+
+################################
+## AdmissionControlMiddleware ##
+################################
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that sheds load before a request reaches routing.
+
+    GET requests (redirects) are high priority and may use the whole concurrency limit,
+    every other request may only use its low priority share. Requests over capacity get
+    an immediate 503 with Retry-After, requests over their client's rate limit a 429.
+    Either check can be used without the other.
+    """
+
+    def __init__(
+        self,
+        app,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        retry_after_seconds: int = 1,
+        exempt_paths: tuple = ("/ping", "/metrics"),
+    ) -> None:
+        """
+        Initializes the AdmissionControlMiddleware.
+
+        Args:
+            app: The ASGI application to protect.
+            concurrency_limit (Optional[AdaptiveConcurrencyLimit]): The limit requests are admitted
+                                                                     against, if any.
+            rate_limiter (Optional[TokenBucketRateLimiter]): Optional per client rate limits.
+            retry_after_seconds (int): The Retry-After value sent with 503 responses.
+            exempt_paths (tuple): Paths that are never shed (health checks, metrics).
+        """
+        self.app = app
+        self.concurrency_limit = concurrency_limit
+        self.rate_limiter = rate_limiter
+        self.retry_after_seconds = retry_after_seconds
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope, receive, send) -> None:
+
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter:
+            client = scope["client"][0] if scope.get("client") else ""
+            allowed, retry_after = self.rate_limiter.allow(client)
+            if not allowed:
+                await self.reject(send, 429, "rate limit exceeded", math.ceil(retry_after))
+                return
+
+        if not self.concurrency_limit:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.concurrency_limit.try_acquire(high_priority=scope["method"] == "GET"):
+            await self.reject(send, 503, "server is over capacity", self.retry_after_seconds)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency_limit.release()
+
+    @staticmethod
+    async def reject(send, status_code: int, message: str, retry_after: int) -> None:
+        """
+        Sends an ErrorResponse with a Retry-After header.
+        """
+        _response_body = ErrorResponse.construct_response(
+            request_id=str(uuid4()),
+            message=message,
+            data=None
+        )
+        body = orjson.dumps(_response_body.model_dump())
+
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
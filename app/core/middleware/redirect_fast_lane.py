@@ -0,0 +1,249 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import orjson
+from pymongo.errors import ExecutionTimeout
+from starlette.middleware.cors import CORSMiddleware
+
+from app.core.clients.hits_counter import HitsCounter
+from app.core.schema.response_schema import ErrorResponse
+from app.core.middleware.admission_control import (
+    AdaptiveConcurrencyLimit,
+    AdmissionControlMiddleware,
+    TokenBucketRateLimiter,
+)
+from app.core.storage.storage_backend import StorageBackend
+from app.utils.utils import redirect_cache_headers, redirect_location
+from app.core.tracing.request_trace import RequestSummaryLogger, annotate, current_trace, end_trace, record_error, span
+
+
+######################
+## RedirectFastLane ##
+######################
+
+
+class RedirectFastLane:
+    """
+    ASGI application mounted in front of the FastAPI app that serves redirect shaped
+    requests (GET /{short_key} with a key matching the short key grammar) without going
+    through middleware, routing, dependency resolution or exception handlers.
+
+    The lookup is a single read of the fields a redirect needs (hedged on MongoDB like
+    the route's) bounded by the read deadline, and the hit is counted by the same
+    HitsCounter as the route's, so it is written with the next batch. Everything else (other methods, static routes, keys outside the grammar) falls
+    through to the FastAPI app unchanged. The redirects it serves go through the same
+    CORS handling, rate limits and concurrency limit as the FastAPI app's requests.
+    """
+
+    def __init__(
+        self,
+        app,
+        storage_backend: StorageBackend,
+        summary_logger: RequestSummaryLogger,
+        hits_counter: HitsCounter,
+        key_pattern: str,
+        read_timeout_ms: int,
+        redirect_status_code: int,
+        redirect_cache_max_age: int,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        retry_after_seconds: int = 1,
+        cors_options: Optional[dict] = None,
+    ) -> None:
+        """
+        Initializes the RedirectFastLane.
+
+        Args:
+            app: The FastAPI app requests fall through to.
+            storage_backend (StorageBackend): The store of url mappings.
+            summary_logger (RequestSummaryLogger): Logs the summary line of every fast lane request.
+            hits_counter (HitsCounter): Counts the hits of the redirects served.
+            key_pattern (str): Regular expression of the short keys served by the fast lane.
+            read_timeout_ms (int): The client side deadline of the lookup.
+            redirect_status_code (int): The status code of redirects, unless a mapping overrides it.
+            redirect_cache_max_age (int): The Cache-Control max-age of redirects,
+                                          unless a mapping overrides it.
+            concurrency_limit (Optional[AdaptiveConcurrencyLimit]): The admission control limit
+                                          fast lane requests are admitted against, if enabled.
+            rate_limiter (Optional[TokenBucketRateLimiter]): The per client rate limits of the
+                                          app, if enabled.
+            retry_after_seconds (int): The Retry-After value sent with 503 responses.
+            cors_options (Optional[dict]): The options of the app's CORSMiddleware, applied to
+                                          fast lane redirects too.
+        """
+        self.app = app
+        self.storage_backend = storage_backend
+        self.summary_logger = summary_logger
+        self.hits_counter = hits_counter
+        self.key_regex = re.compile(key_pattern)
+        self.read_timeout = read_timeout_ms / 1000
+        self.redirect_status_code = redirect_status_code
+        self.redirect_cache_max_age = redirect_cache_max_age
+        self.concurrency_limit = concurrency_limit
+        self.rate_limiter = rate_limiter
+        self.retry_after_seconds = retry_after_seconds
+
+        self._serve = self._admit
+        if cors_options is not None:
+            self._serve = CORSMiddleware(self._admit, **cors_options)
+
+        self._static_paths: Optional[set] = None
+        self._cache_headers: Dict[int, List[Tuple[bytes, bytes]]] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        short_key = path[1:]
+        if not self.key_regex.fullmatch(short_key) or path in self.static_paths:
+            await self.app(scope, receive, send)
+            return
+
+        await self._serve(scope, receive, send)
+
+    async def _admit(self, scope, receive, send) -> None:
+        """
+        Admits a redirect like the admission control middleware does, then serves it.
+        """
+        if self.rate_limiter:
+            client = scope["client"][0] if scope.get("client") else ""
+            allowed, retry_after = self.rate_limiter.allow(client)
+            if not allowed:
+                await AdmissionControlMiddleware.reject(send, 429, "rate limit exceeded", math.ceil(retry_after))
+                return
+
+        if self.concurrency_limit and not self.concurrency_limit.try_acquire(high_priority=True):
+            await AdmissionControlMiddleware.reject(send, 503, "server is over capacity", self.retry_after_seconds)
+            return
+
+        try:
+            await self._redirect(scope, send, scope["path"][1:])
+        finally:
+            if self.concurrency_limit:
+                self.concurrency_limit.release()
+
+    @property
+    def static_paths(self) -> set:
+        """
+        Paths of the app's static GET routes (e.g. /ping), which are not short keys.
+        Computed on first use, once every route has been added.
+        """
+        if self._static_paths is None:
+            self._static_paths = {
+                route.path for route in self.app.routes
+                if "{" not in route.path and "GET" in getattr(route, "methods", ())
+            }
+        return self._static_paths
+
+    async def _redirect(self, scope, send, short_key: str) -> None:
+        """
+        Serves a redirect request and logs its summary line.
+        """
+        request_id = str(uuid4())
+        trace_token = self.summary_logger.start(request_id)
+        annotate(short_key=short_key, fast_lane=True)
+
+        status_code = 500
+        try:
+            status_code = await self._lookup_and_send(send, request_id, short_key)
+        finally:
+            self.summary_logger.log(
+                current_trace(),
+                method="GET",
+                route="/{short_key}",
+                path=scope["path"],
+                status_code=status_code,
+                client_host=scope["client"][0] if scope.get("client") else None,
+            )
+            end_trace(trace_token)
+
+    async def _lookup_and_send(self, send, request_id: str, short_key: str) -> int:
+        """
+        Looks up a short key, counts its hit and sends the redirect, or the error response.
+
+        Returns:
+            int: The status code sent.
+        """
+        try:
+            with span("db_query"):
+                redirect_target = await asyncio.wait_for(
+                    self.storage_backend.get_redirect_target(short_key), self.read_timeout
+                )
+        except (asyncio.TimeoutError, ExecutionTimeout):
+            record_error("504 database deadline exceeded")
+            await self._send_error(send, request_id, 504, "database deadline exceeded")
+            return 504
+        except Exception as e:
+            record_error(str(e))
+            await self._send_error(send, request_id, 500, str(e))
+            return 500
+
+        if redirect_target is None:
+            annotate(outcome="not_found")
+            record_error("404 invalid short key")
+            await self._send_error(send, request_id, 404, "invalid short key")
+            return 404
+
+        self.hits_counter.count(short_key)
+
+        status_code = redirect_target.redirect_status_code or self.redirect_status_code
+        max_age = redirect_target.redirect_cache_max_age
+        if max_age is None:
+            max_age = self.redirect_cache_max_age
+
+        annotate(outcome="redirected", target_url=redirect_target.target_url)
+        with span("response_construction"):
+            await send({
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"location", redirect_location(redirect_target.target_url).encode()),
+                    *self._redirect_headers(max_age),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b""})
+        return status_code
+
+    def _redirect_headers(self, max_age: int) -> List[Tuple[bytes, bytes]]:
+        """
+        Returns the prebuilt constant headers of a redirect with the given max-age.
+        """
+        headers = self._cache_headers.get(max_age)
+        if headers is None:
+            headers = [(b"content-length", b"0")]
+            for name, value in redirect_cache_headers(max_age).items():
+                headers.append((name.lower().encode(), value.encode()))
+            self._cache_headers[max_age] = headers
+        return headers
+
+    @staticmethod
+    async def _send_error(send, request_id: str, status_code: int, message: str) -> None:
+        """
+        Sends the same ErrorResponse body the FastAPI exception handlers send.
+        """
+        _response_body = ErrorResponse.construct_response(
+            request_id=request_id,
+            message=message,
+            data=None
+        )
+        body = orjson.dumps(_response_body.model_dump())
+
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
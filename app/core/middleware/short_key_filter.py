@@ -0,0 +1,95 @@
+#############
+## Imports ##
+#############
+
+from typing import List, Optional, Pattern
+
+import orjson
+
+from app.core.schema.response_schema import ErrorResponse
+
+
+####################
+## ShortKeyFilter ##
+####################
+
+
+class ShortKeyFilter:
+    """
+    ASGI application mounted in front of the app that answers redirect requests
+    (GET /{short_key}) whose key does not match the short key grammar with a prebuilt
+    404, before any lookup, middleware or per request logging. No mapping can exist for
+    such a key (e.g. scanners probing /wp-login.php, or multi-kilobyte paths).
+
+    Rejected keys are counted. Everything else falls through to the app unchanged.
+    """
+
+    def __init__(self, app, routes: List, key_grammar: Pattern[str]) -> None:
+        """
+        Initializes the ShortKeyFilter.
+
+        Args:
+            app: The ASGI application requests fall through to.
+            routes (List): The routes of the FastAPI app, whose static GET paths are not short keys.
+            key_grammar (Pattern[str]): The grammar every short key matches.
+        """
+        self.app = app
+        self.routes = routes
+        self.key_grammar = key_grammar
+
+        self.rejected_keys = 0
+        self._static_paths: Optional[set] = None
+
+        # The response is the same for every rejected key, so it is built once
+        body = orjson.dumps(
+            ErrorResponse.construct_response(request_id="", message="invalid short key").model_dump()
+        )
+        self._response_start = {
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+        self._response_body = {"type": "http.response.body", "body": body}
+
+    async def __call__(self, scope, receive, send) -> None:
+
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        short_key = path[1:]
+        if (
+            self.key_grammar.fullmatch(short_key)
+            or not short_key
+            or "/" in short_key
+            or path in self.static_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        self.rejected_keys += 1
+        await send(self._response_start)
+        await send(self._response_body)
+
+    @property
+    def static_paths(self) -> set:
+        """
+        Paths of the app's static GET routes (e.g. /openapi.json), which are not short keys.
+        Computed on first use, once every route has been added.
+        """
+        if self._static_paths is None:
+            self._static_paths = {
+                route.path for route in self.routes
+                if "{" not in route.path and "GET" in getattr(route, "methods", ())
+            }
+        return self._static_paths
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the filter, for the metrics endpoint.
+        """
+        return {"enabled": True, "rejected_keys": self.rejected_keys}
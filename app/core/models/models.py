@@ -3,9 +3,11 @@
 #############
 
 from datetime import datetime
+from typing import Any, Optional
 
 from beanie import Document, Indexed
-from pydantic import Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pymongo import ASCENDING, IndexModel
 
 from app import config
 
@@ -29,6 +31,10 @@ class UrlMappings(Document):
     - app_version (str): Field representing the application version associated with the URL mapping.
     - create_date (datetime): DateTime representing the creation date for the URL mapping, 
                               default is the current datetime.
+    - redirect_status_code (Optional[int]): Status code of redirects for this mapping,
+                                            default is None (use redirect_status_code setting).
+    - redirect_cache_max_age (Optional[int]): Cache-Control max-age of redirects for this mapping,
+                                              default is None (use redirect_cache_max_age setting).
     
     Settings:
     - name (str): Collection name for storing URL mappings data.
@@ -42,9 +48,76 @@ class UrlMappings(Document):
     tags: list = Field(default=None)
     app_version: str = Field(...)
     create_date: datetime = Field(default_factory=datetime.now)
+    redirect_status_code: Optional[int] = Field(default=None)
+    redirect_cache_max_age: Optional[int] = Field(default=None)
 
     class Settings:
         name = config.db_url_mappings_collection_name
         indexes = [
             [("target_url", 1), ("is_active", 1)],  # Compound unique index
         ]
+
+
+class UrlMappingRecord(BaseModel):
+    """
+    Represents a URL mapping independently of the storage backend it is stored in
+    (see app/core/storage), with the fields of UrlMappings.
+
+    Attributes:
+    - id (Optional[str]): Identifier of the stored mapping (_id), None until it is inserted.
+    - The other attributes are the ones of UrlMappings.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: Optional[str] = Field(default=None, alias="_id")
+    target_url: str = Field(...)
+    short_key: str = Field(...)
+    hits: int = Field(default=0)
+    is_active: bool = Field(default=True)
+    is_custom_key: bool = Field(default=False)
+    tags: Optional[list] = Field(default=None)
+    app_version: str = Field(...)
+    create_date: datetime = Field(default_factory=datetime.now)
+    redirect_status_code: Optional[int] = Field(default=None)
+    redirect_cache_max_age: Optional[int] = Field(default=None)
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def validate_id(cls, value: Any) -> Optional[str]:
+        """
+        Accepts ObjectId identifiers of stored documents as strings.
+        """
+        return str(value) if value is not None else None
+
+
+class IdempotencyRecords(Document):
+    """
+    Represents the stored response of a request made with an Idempotency-Key header.
+
+    Attributes:
+    - idempotency_key (str): Unique indexed field holding the client supplied idempotency key.
+    - fingerprint (str): Digest of the request that produced the stored response.
+    - status_code (int): HTTP status code of the stored response.
+    - body (dict): JSON body of the stored response.
+    - create_date (datetime): DateTime representing when the response was stored,
+                              documents expire idempotency_ttl_seconds after it.
+
+    Settings:
+    - name (str): Collection name for storing idempotent responses.
+    """
+
+    idempotency_key: Indexed(str, unique=True) = Field(...)
+    fingerprint: str = Field(...)
+    status_code: int = Field(...)
+    body: dict = Field(...)
+    create_date: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = config.db_idempotency_collection_name
+        indexes = [
+            IndexModel(
+                [("create_date", ASCENDING)],
+                expireAfterSeconds=config.idempotency_ttl_seconds
+            ),  # TTL index
+        ]
@@ -0,0 +1,157 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+import orjson
+from pyinstrument import Profiler
+
+from app.core.tracing.request_trace import RequestTrace
+
+
+#####################
+## RequestProfiler ##
+#####################
+
+
+class ProfiledRequest:
+    """
+    A request being profiled and its sampling profiler. In strict async mode the profiler
+    only records the frames of the async context it was started in (the request's, and
+    the tasks it starts): time the request spends awaiting is reported as [await], and
+    time the event loop spends on other requests meanwhile as [out-of-context].
+    """
+
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.started_at = time.time()
+
+        self.profiler = Profiler(async_mode="strict")
+        self.profiler.start()
+
+    def stop(self) -> None:
+        """
+        Stops the profiler.
+        """
+        self.profiler.stop()
+
+
+class RequestProfiler:
+    """
+    Decides which requests are profiled and writes their profiles, with their stage timings,
+    to a bounded directory of dump files.
+
+    A request is profiled when it carries the x-profile header with the configured token,
+    or when it is the sample_rate-th request since the last sampled one. Only one request
+    is profiled at a time, since a process runs one sampling profiler at a time.
+    """
+
+    def __init__(self, token: str, sample_rate: int, dump_dir: str, max_dumps: int) -> None:
+        """
+        Initializes the RequestProfiler.
+
+        Args:
+            token (str): The value of the x-profile header that requests a profile, empty disables it.
+            sample_rate (int): Profile one request in sample_rate, 0 disables sampling.
+            dump_dir (str): The directory profiles are written to.
+            max_dumps (int): The maximum number of profiles kept, the oldest are removed first.
+        """
+        self.token = token
+        self.sample_rate = sample_rate
+        self.dump_dir = dump_dir
+        self.max_dumps = max_dumps
+
+        self._requests_seen = 0
+        self._active: Optional[ProfiledRequest] = None
+
+    def start(self, request_id: str, profile_header: Optional[str]) -> Optional[ProfiledRequest]:
+        """
+        Starts profiling a request if it was asked for or sampled.
+
+        Args:
+            request_id (str): The ID of the request.
+            profile_header (Optional[str]): The value of the request's x-profile header.
+
+        Returns:
+            Optional[ProfiledRequest]: The profiled request, None if the request is not profiled.
+        """
+        requested = bool(self.token) and profile_header == self.token
+
+        sampled = False
+        if self.sample_rate:
+            self._requests_seen += 1
+            sampled = self._requests_seen >= self.sample_rate
+
+        if not (requested or sampled) or self._active is not None:
+            return None
+
+        if sampled:
+            self._requests_seen = 0
+        self._active = ProfiledRequest(request_id)
+        return self._active
+
+    async def finish(
+        self,
+        profiled_request: ProfiledRequest,
+        trace: RequestTrace,
+        method: str,
+        path: str,
+        status_code: int,
+    ) -> str:
+        """
+        Stops profiling a request and writes its dump files.
+
+        Args:
+            profiled_request (ProfiledRequest): The profiled request.
+            trace (RequestTrace): The stage trace of the request.
+            method (str): The HTTP method of the request.
+            path (str): The path of the request.
+            status_code (int): The status code of the response.
+
+        Returns:
+            str: The path of the dump files, without extension.
+        """
+        profiled_request.stop()
+        self._active = None
+
+        summary = {
+            "request_id": profiled_request.request_id,
+            "method": method,
+            "path": path,
+            "status_code": status_code,
+            "execution_time_ms": round((time.time() - profiled_request.started_at) * 1000, 3),
+            "stages_ms": trace.stage_timings_ms(),
+        }
+        return await asyncio.to_thread(self._dump, profiled_request, summary)
+
+    def _dump(self, profiled_request: ProfiledRequest, summary: dict) -> str:
+        """
+        Writes the profile and the summary of a request, then removes the oldest dumps
+        over max_dumps. Runs in a worker thread.
+        """
+        os.makedirs(self.dump_dir, exist_ok=True)
+        dump_path = os.path.join(
+            self.dump_dir,
+            f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{profiled_request.request_id}"
+        )
+
+        with open(f"{dump_path}.html", "w") as dump_file:
+            dump_file.write(profiled_request.profiler.output_html())
+
+        with open(f"{dump_path}.json", "wb") as dump_file:
+            dump_file.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+
+        # Dump names start with their creation time, so sorting them sorts by age
+        dumps = sorted({os.path.splitext(name)[0] for name in os.listdir(self.dump_dir)})
+        for stale_dump in dumps[:max(0, len(dumps) - self.max_dumps)]:
+            for extension in (".html", ".json"):
+                stale_path = os.path.join(self.dump_dir, stale_dump + extension)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+
+        return dump_path
@@ -3,6 +3,7 @@
 #############
 
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 ##################
@@ -38,3 +39,14 @@ class ShortenUrlData(BaseModel):
     is_custom_key: bool  # Indicates if the key is user-generated
     tags: list  # List of tags associated with the URL mapping
     app_version: str  # Version of the application handling the mapping
+    redirect_status_code: Optional[int] = None  # Redirect status code override of the mapping
+    redirect_cache_max_age: Optional[int] = None  # Redirect Cache-Control max-age override of the mapping
+
+class ResolvedShortKeyData(BaseModel):
+    """
+    Schema for data related to a resolved short key in API responses.
+    """
+    short_key: str  # Short key that was resolved
+    found: bool  # Indicates if a mapping exists for the short key
+    target_url: Optional[str] = None  # Original URL the short key redirects to
+    is_active: Optional[bool] = None  # Indicates if the URL mapping is active
@@ -2,8 +2,11 @@
 ## Imports ##
 #############
 
-from typing import Union
-from pydantic import BaseModel
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, Field, field_validator
+from pydantic_core import PydanticCustomError
+
+from app import config, custom_key_grammar
 
 #####################
 ## Request Schemas ##
@@ -15,6 +18,8 @@ class ShortenUrlRequest(BaseModel):
     """
     target_url: str  # The original URL to be shortened
     tags: Union[list, None]  # Optional list of tags associated with the URL
+    redirect_status_code: Optional[Literal[301, 302, 307, 308]] = None  # Overrides the redirect status code
+    redirect_cache_max_age: Optional[int] = Field(None, ge=0)  # Overrides the redirect Cache-Control max-age
 
     def __getattr__(self, name):
         """
@@ -28,8 +33,41 @@ class SystemShortenUrlRequest(ShortenUrlRequest):
     """
     short_key_length: int  # Length of the shortened key
 
+    @field_validator("short_key_length")
+    @classmethod
+    def validate_short_key_length(cls, value: int) -> int:
+        """
+        Ensures the key is within the short key grammar, when it is enforced.
+        """
+        if config.short_key_grammar_enforced and not config.short_key_min_length <= value <= config.short_key_max_length:
+            raise PydanticCustomError(
+                "short_key_length",
+                f"short_key_length must be between {config.short_key_min_length} and {config.short_key_max_length}",
+            )
+        return value
+
 class CustomShortenUrlRequest(ShortenUrlRequest):
     """
     Schema for custom shortened URLs.
     """
     custom_key: str  # The custom key provided for the shortened URL
+
+    @field_validator("custom_key")
+    @classmethod
+    def validate_custom_key(cls, value: str) -> str:
+        """
+        Ensures the key is within the short key grammar, when it is enforced.
+        """
+        if config.short_key_grammar_enforced and not custom_key_grammar.fullmatch(value):
+            raise PydanticCustomError(
+                "custom_key",
+                f"custom_key must be {config.custom_key_min_length} to {config.custom_key_max_length} letters, "
+                f"digits or characters of {config.custom_key_extra_characters!r}",
+            )
+        return value
+
+class ResolveShortKeysRequest(BaseModel):
+    """
+    Schema for the request to resolve many short keys at once.
+    """
+    short_keys: List[str] = Field(..., min_length=1, max_length=config.resolve_max_short_keys)  # Short keys to resolve
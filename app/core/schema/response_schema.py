@@ -3,8 +3,8 @@
 #############
 
 from datetime import datetime
-from typing import Any
-from app.core.schema.base_schema import BaseMeta, ShortenUrlData, BaseResponse
+from typing import Any, Dict, List
+from app.core.schema.base_schema import BaseMeta, ShortenUrlData, ResolvedShortKeyData, BaseResponse
 
 ######################
 ## Response Schemas ##
@@ -49,6 +49,8 @@ class ShortenUrlResponse(BaseResponse):
             is_custom_key= url_mapping.is_custom_key,
             tags= url_mapping.tags,
             app_version= url_mapping.app_version,
+            redirect_status_code= url_mapping.redirect_status_code,
+            redirect_cache_max_age= url_mapping.redirect_cache_max_age,
         )
 
         return cls(
@@ -56,6 +58,53 @@ class ShortenUrlResponse(BaseResponse):
             data = shorten_url_data
         )
 
+class ResolveShortKeysResponse(BaseResponse):
+    """
+    Response schema for the API endpoint that resolves many short keys at once.
+    """
+    meta: BaseMeta  # Metadata for the response
+    data: List[ResolvedShortKeyData]  # One entry per requested short key, in request order
+
+    @classmethod
+    def construct_response(cls, successful: bool, request_id: str, message: str, short_keys: List[str], url_mappings: Dict[str, dict]):
+        """
+        Constructs a ResolveShortKeysResponse object with the given parameters.
+
+        Args:
+            successful (bool): Indicates if the operation was successful.
+            request_id (str): The ID of the request.
+            message (str): The message associated with the response.
+            short_keys (List[str]): The requested short keys, without duplicates.
+            url_mappings (Dict[str, dict]): The projected URL mappings found, by short key.
+
+        Returns:
+            ResolveShortKeysResponse: The constructed ResolveShortKeysResponse object.
+        """
+
+        base_meta = BaseMeta(
+            successful= successful,
+            request_id= request_id,
+            message= message,
+            create_date= datetime.now(),
+        )
+
+        resolved_short_keys = []
+        for short_key in short_keys:
+            url_mapping = url_mappings.get(short_key)
+            resolved_short_keys.append(
+                ResolvedShortKeyData(
+                    short_key= short_key,
+                    found= url_mapping is not None,
+                    target_url= url_mapping["target_url"] if url_mapping else None,
+                    is_active= url_mapping["is_active"] if url_mapping else None,
+                )
+            )
+
+        return cls(
+            meta = base_meta,
+            data = resolved_short_keys
+        )
+
 class ErrorResponse(BaseResponse):
     """
     Response schema for error responses.
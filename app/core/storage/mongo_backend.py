@@ -0,0 +1,113 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import heapq
+from typing import AsyncIterator, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.clients.database_client import DatabaseClient
+from app.core.clients.hedged_reader import HedgedReader
+from app.core.models.models import UrlMappingRecord
+from app.core.storage.storage_backend import DuplicateShortKeyError, RedirectTarget, StorageBackend
+
+
+#########################
+## MongoStorageBackend ##
+#########################
+
+
+class MongoStorageBackend(StorageBackend):
+    """
+    Stores URL mappings in MongoDB, across the shards of the DatabaseClient. Short key
+    lookups are hedged reads (see HedgedReader). The database connection is opened and
+    closed with the DatabaseClient, which Beanie also uses.
+    """
+
+    def __init__(self, database_client: DatabaseClient, hedged_reader: HedgedReader, read_timeout_ms: int) -> None:
+        """
+        Initializes the MongoStorageBackend.
+
+        Args:
+            database_client (DatabaseClient): The client routing short keys to their shards.
+            hedged_reader (HedgedReader): The reader of short key lookups.
+            read_timeout_ms (int): The server side deadline (maxTimeMS) of reads.
+        """
+        self.database_client = database_client
+        self.hedged_reader = hedged_reader
+        self.read_timeout_ms = read_timeout_ms
+
+    async def get_by_key(self, short_key: str) -> Optional[UrlMappingRecord]:
+        for collection in self.database_client.url_mappings_collections(short_key):
+            raw_url_mapping = await self.hedged_reader.find_one(
+                collection,
+                {"short_key": short_key, "is_active": True},
+                max_time_ms=self.read_timeout_ms
+            )
+            if raw_url_mapping:
+                return UrlMappingRecord.model_validate(raw_url_mapping)
+        return None
+
+    async def get_many_by_key(self, short_keys: List[str]) -> List[dict]:
+        return await self.database_client.find_url_mappings(
+            short_keys,
+            projection={"_id": 0, "short_key": 1, "target_url": 1, "is_active": 1},
+            max_time_ms=self.read_timeout_ms,
+        )
+
+    async def find_by_target(self, target_url: str) -> Optional[UrlMappingRecord]:
+        raw_url_mapping = await self.database_client.find_url_mapping_by_target(
+            target_url, max_time_ms=self.read_timeout_ms
+        )
+        return UrlMappingRecord.model_validate(raw_url_mapping) if raw_url_mapping else None
+
+    async def insert(self, url_mapping: UrlMappingRecord) -> UrlMappingRecord:
+        document = url_mapping.model_dump(exclude={"id"})
+        try:
+            await self.database_client.insert_url_mapping(document)
+        except DuplicateKeyError as e:
+            raise DuplicateShortKeyError(url_mapping.short_key) from e
+        return url_mapping.model_copy(update={"id": str(document["_id"])})
+
+    async def increment_hits(self, hits: Dict[str, int]) -> None:
+        await self.database_client.increment_hits(hits)
+
+    async def list(self, skip: int = 0, limit: int = 100) -> List[UrlMappingRecord]:
+        # The first skip + limit mappings of every shard, merged by creation date
+        results = await asyncio.gather(*(
+            shard.url_mappings.find({}, max_time_ms=self.read_timeout_ms)
+            .sort("create_date", 1)
+            .limit(skip + limit)
+            .to_list(None)
+            for shard in self.database_client.all_shards()
+        ))
+        raw_url_mappings = list(heapq.merge(*results, key=lambda raw_url_mapping: raw_url_mapping["create_date"]))
+        return [UrlMappingRecord.model_validate(raw_url_mapping) for raw_url_mapping in raw_url_mappings[skip:skip + limit]]
+
+    async def iter_short_keys(self) -> AsyncIterator[str]:
+        for shard in self.database_client.all_shards():
+            async for url_mapping in shard.url_mappings.find({}, projection={"_id": 0, "short_key": 1}):
+                yield url_mapping["short_key"]
+
+    async def get_redirect_target(self, short_key: str) -> Optional[RedirectTarget]:
+        for collection in self.database_client.url_mappings_collections(short_key):
+            url_mapping = await self.hedged_reader.find_one(
+                collection,
+                {"short_key": short_key, "is_active": True},
+                max_time_ms=self.read_timeout_ms,
+                projection={
+                    "_id": 0,
+                    "target_url": 1,
+                    "redirect_status_code": 1,
+                    "redirect_cache_max_age": 1,
+                },
+            )
+            if url_mapping:
+                return RedirectTarget(
+                    url_mapping["target_url"],
+                    url_mapping.get("redirect_status_code"),
+                    url_mapping.get("redirect_cache_max_age"),
+                )
+        return None
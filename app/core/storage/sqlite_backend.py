@@ -0,0 +1,252 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from bson import ObjectId
+
+from app.core.models.models import UrlMappingRecord
+from app.core.storage.storage_backend import DuplicateShortKeyError, RedirectTarget, StorageBackend
+
+
+##########################
+## SQLiteStorageBackend ##
+##########################
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_mappings (
+    id TEXT PRIMARY KEY,
+    short_key TEXT NOT NULL UNIQUE,
+    target_url TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    is_custom_key INTEGER NOT NULL DEFAULT 0,
+    tags TEXT,
+    app_version TEXT NOT NULL,
+    create_date TEXT NOT NULL,
+    redirect_status_code INTEGER,
+    redirect_cache_max_age INTEGER
+);
+CREATE INDEX IF NOT EXISTS url_mappings_target_url ON url_mappings (target_url, is_active);
+"""
+
+_COLUMNS = (
+    "id, short_key, target_url, hits, is_active, is_custom_key, tags, app_version, "
+    "create_date, redirect_status_code, redirect_cache_max_age"
+)
+
+# Statements are constant, so sqlite3 prepares each one once and reuses it from its cache
+_SELECT_BY_KEY = f"SELECT {_COLUMNS} FROM url_mappings WHERE short_key = ? AND is_active = 1"
+_SELECT_REDIRECT = (
+    "SELECT target_url, redirect_status_code, redirect_cache_max_age "
+    "FROM url_mappings WHERE short_key = ? AND is_active = 1"
+)
+_SELECT_MANY_BY_KEY = (
+    "SELECT short_key, target_url, is_active FROM url_mappings "
+    "WHERE short_key IN (SELECT value FROM json_each(?))"
+)
+_SELECT_BY_TARGET = f"SELECT {_COLUMNS} FROM url_mappings WHERE target_url = ? AND is_active = 1 LIMIT 1"
+_SELECT_SHORT_KEYS = "SELECT short_key FROM url_mappings"
+_SELECT_PAGE = f"SELECT {_COLUMNS} FROM url_mappings ORDER BY create_date LIMIT ? OFFSET ?"
+_INSERT = f"INSERT INTO url_mappings ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INCREMENT_HITS = "UPDATE url_mappings SET hits = hits + ? WHERE short_key = ? AND is_active = 1"
+
+
+def _to_record(row: Tuple) -> UrlMappingRecord:
+    """
+    Builds a UrlMappingRecord from a row of _COLUMNS.
+    """
+    return UrlMappingRecord(
+        id=row[0],
+        short_key=row[1],
+        target_url=row[2],
+        hits=row[3],
+        is_active=bool(row[4]),
+        is_custom_key=bool(row[5]),
+        tags=orjson.loads(row[6]) if row[6] is not None else None,
+        app_version=row[7],
+        create_date=datetime.fromisoformat(row[8]),
+        redirect_status_code=row[9],
+        redirect_cache_max_age=row[10],
+    )
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Stores URL mappings in an embedded SQLite database in WAL mode, for deployments
+    without MongoDB. Every worker process opens its own connections to the same file.
+
+    Reads run on the event loop, since an indexed lookup takes microseconds. Writes run
+    in a worker thread on a separate connection, since they may wait for the write lock
+    of another process.
+
+    The duration of every read and write, waits for the write lock included, is reported
+    to latency_observer (e.g. the admission control limit, which pymongo command events
+    feed on MongoDB).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        busy_timeout_ms: int = 500,
+        latency_observer: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        """
+        Initializes the SQLiteStorageBackend.
+
+        Args:
+            path (str): The path of the database file.
+            busy_timeout_ms (int): How long a write waits for the write lock of another process,
+                                   kept below the deadline of writes.
+            latency_observer (Optional[Callable[[float], None]]): Called with the duration in
+                                   seconds of every read and write, if set.
+        """
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.latency_observer = latency_observer
+
+        self.connection: Optional[sqlite3.Connection] = None
+        self._write_connection: Optional[sqlite3.Connection] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Opens a connection in autocommit mode, transactions are explicit.
+        """
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=64)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        return connection
+
+    async def connect(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._write_connection = self._connect()
+        self._write_connection.executescript(_SCHEMA)
+        self.connection = self._connect()
+
+        self._write_lock = asyncio.Lock()
+
+    async def disconnect(self) -> None:
+        self.connection.close()
+        self._write_connection.close()
+
+    def _observe(self, started_at: float) -> None:
+        """
+        Reports the duration of an operation started at started_at (monotonic time).
+        """
+        if self.latency_observer is not None:
+            self.latency_observer(time.monotonic() - started_at)
+
+    def _read(self, statement: str, parameters: Tuple, fetch_all: bool = False):
+        """
+        Runs a query on the read connection, returns its first row (or all rows).
+        """
+        started_at = time.monotonic()
+        cursor = self.connection.execute(statement, parameters)
+        rows = cursor.fetchall() if fetch_all else cursor.fetchone()
+        self._observe(started_at)
+        return rows
+
+    async def _write(self, statement: str, parameters: List[Tuple]) -> None:
+        """
+        Runs a statement for every set of parameters in one transaction, in a worker thread.
+
+        The thread cannot be interrupted, so the write lock is held until it returns even
+        if the caller is cancelled (e.g. by its deadline). A write whose caller gave up
+        before it got the database lock is rolled back instead of committed.
+        """
+        abandoned = threading.Event()
+
+        def write() -> None:
+            self._write_connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_connection.executemany(statement, parameters)
+            except BaseException:
+                self._write_connection.execute("ROLLBACK")
+                raise
+            self._write_connection.execute("ROLLBACK" if abandoned.is_set() else "COMMIT")
+
+        def release(task: asyncio.Future) -> None:
+            self._write_lock.release()
+            self._observe(started_at)
+            # Retrieve the error a cancelled caller no longer awaits
+            if not task.cancelled():
+                task.exception()
+
+        started_at = time.monotonic()
+        await self._write_lock.acquire()
+        task = asyncio.ensure_future(asyncio.to_thread(write))
+        task.add_done_callback(release)
+
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            abandoned.set()
+            raise
+
+    async def get_by_key(self, short_key: str) -> Optional[UrlMappingRecord]:
+        row = self._read(_SELECT_BY_KEY, (short_key,))
+        return _to_record(row) if row else None
+
+    async def get_many_by_key(self, short_keys: List[str]) -> List[dict]:
+        rows = self._read(_SELECT_MANY_BY_KEY, (orjson.dumps(short_keys).decode(),), fetch_all=True)
+        return [
+            {"short_key": short_key, "target_url": target_url, "is_active": bool(is_active)}
+            for short_key, target_url, is_active in rows
+        ]
+
+    async def find_by_target(self, target_url: str) -> Optional[UrlMappingRecord]:
+        row = self._read(_SELECT_BY_TARGET, (target_url,))
+        return _to_record(row) if row else None
+
+    async def insert(self, url_mapping: UrlMappingRecord) -> UrlMappingRecord:
+        url_mapping = url_mapping.model_copy(update={"id": str(ObjectId())})
+        try:
+            await self._write(_INSERT, [(
+                url_mapping.id,
+                url_mapping.short_key,
+                url_mapping.target_url,
+                url_mapping.hits,
+                int(url_mapping.is_active),
+                int(url_mapping.is_custom_key),
+                orjson.dumps(url_mapping.tags).decode() if url_mapping.tags is not None else None,
+                url_mapping.app_version,
+                url_mapping.create_date.isoformat(),
+                url_mapping.redirect_status_code,
+                url_mapping.redirect_cache_max_age,
+            )])
+        except sqlite3.IntegrityError as e:
+            raise DuplicateShortKeyError(url_mapping.short_key) from e
+        return url_mapping
+
+    async def increment_hits(self, hits: Dict[str, int]) -> None:
+        if hits:
+            await self._write(_INCREMENT_HITS, [(count, short_key) for short_key, count in hits.items()])
+
+    async def list(self, skip: int = 0, limit: int = 100) -> List[UrlMappingRecord]:
+        rows = self._read(_SELECT_PAGE, (limit, skip), fetch_all=True)
+        return [_to_record(row) for row in rows]
+
+    async def iter_short_keys(self) -> AsyncIterator[str]:
+        cursor = self.connection.execute(_SELECT_SHORT_KEYS)
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            for (short_key,) in rows:
+                yield short_key
+
+    async def get_redirect_target(self, short_key: str) -> Optional[RedirectTarget]:
+        row = self._read(_SELECT_REDIRECT, (short_key,))
+        return RedirectTarget(*row) if row else None
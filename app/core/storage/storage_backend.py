@@ -0,0 +1,110 @@
+#############
+## Imports ##
+#############
+
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+from app.core.models.models import UrlMappingRecord
+
+
+####################
+## StorageBackend ##
+####################
+
+
+class DuplicateShortKeyError(Exception):
+    """
+    Raised when a URL mapping is inserted with a short key that is already taken.
+    """
+
+
+class RedirectTarget(NamedTuple):
+    """
+    What a redirect needs from a URL mapping, read without hydrating a UrlMappingRecord.
+    """
+
+    target_url: str
+    redirect_status_code: Optional[int]
+    redirect_cache_max_age: Optional[int]
+
+
+class StorageBackend(ABC):
+    """
+    Interface of the stores URL mappings are kept in, selected with the storage_backend
+    setting. Lookups by short key only return active mappings, except get_many_by_key
+    which reports whether each mapping is active.
+    """
+
+    async def connect(self) -> None:
+        """
+        Opens the store, called once at startup.
+        """
+
+    async def disconnect(self) -> None:
+        """
+        Closes the store, called once at shutdown.
+        """
+
+    @abstractmethod
+    async def get_by_key(self, short_key: str) -> Optional[UrlMappingRecord]:
+        """
+        Returns the active mapping of a short key, None if it has none.
+        """
+
+    @abstractmethod
+    async def get_many_by_key(self, short_keys: List[str]) -> List[dict]:
+        """
+        Returns the short_key, target_url and is_active of the mappings of many short keys,
+        active or not, in no particular order. Missing short keys are left out.
+        """
+
+    @abstractmethod
+    async def find_by_target(self, target_url: str) -> Optional[UrlMappingRecord]:
+        """
+        Returns the active mapping of a target_url, None if it has none.
+        """
+
+    @abstractmethod
+    async def insert(self, url_mapping: UrlMappingRecord) -> UrlMappingRecord:
+        """
+        Inserts a mapping and returns it with its id set.
+
+        Raises:
+            DuplicateShortKeyError: If the short key is already taken.
+        """
+
+    @abstractmethod
+    async def increment_hits(self, hits: Dict[str, int]) -> None:
+        """
+        Adds hits to the active mappings of many short keys at once.
+
+        Args:
+            hits (Dict[str, int]): The number of hits to add, by short key.
+        """
+
+    @abstractmethod
+    async def list(self, skip: int = 0, limit: int = 100) -> List[UrlMappingRecord]:
+        """
+        Returns mappings, oldest first.
+        """
+
+    @abstractmethod
+    def iter_short_keys(self) -> AsyncIterator[str]:
+        """
+        Yields the short key of every mapping, active or not, in no particular order.
+        """
+
+    async def get_redirect_target(self, short_key: str) -> Optional[RedirectTarget]:
+        """
+        Returns the redirect target of the active mapping of a short key, None if it has none.
+        Backends override it to read only the fields a redirect needs.
+        """
+        url_mapping = await self.get_by_key(short_key)
+        if url_mapping is None:
+            return None
+        return RedirectTarget(
+            url_mapping.target_url,
+            url_mapping.redirect_status_code,
+            url_mapping.redirect_cache_max_age,
+        )
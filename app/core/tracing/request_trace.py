@@ -0,0 +1,229 @@
+#############
+## Imports ##
+#############
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+
+##################
+## RequestTrace ##
+##################
+
+
+class RequestTrace:
+    """
+    Collects the stages (spans) and attributes of a single request, which are logged
+    as one summary line once the request is done.
+    """
+
+    def __init__(self, request_id: str, keep_timeline: bool = False) -> None:
+        """
+        Initializes the RequestTrace.
+
+        Args:
+            request_id (str): The ID of the traced request.
+            keep_timeline (bool): Whether every span is kept in order, besides the stage totals.
+        """
+        self.request_id = request_id
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.timeline: Optional[List[Tuple[str, float, float]]] = [] if keep_timeline else None
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Times a stage, adding to the stage's total if it runs more than once.
+
+        Args:
+            name (str): The name of the stage (e.g. db_query, model_hydration).
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended_at = time.perf_counter()
+            self.stages[name] = self.stages.get(name, 0.0) + ended_at - started_at
+            if self.timeline is not None:
+                self.timeline.append((name, started_at, ended_at))
+
+    def stage_timings_ms(self) -> Dict[str, float]:
+        """
+        Returns the stage timings in milliseconds.
+        """
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+    def duration_ms(self) -> float:
+        """
+        Returns the time since the trace started in milliseconds.
+        """
+        return round((time.perf_counter() - self.started_at) * 1000, 3)
+
+
+# Trace of the request being handled in the current context, None when not tracing
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+
+class _NoSpan:
+    """
+    Context manager used by span() when the current request is not traced.
+    """
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def start_trace(request_id: str, keep_timeline: bool = False) -> Token:
+    """
+    Starts tracing the request handled in the current context.
+
+    Args:
+        request_id (str): The ID of the request.
+        keep_timeline (bool): Whether every span is kept in order, besides the stage totals.
+
+    Returns:
+        Token: The token to pass to end_trace.
+    """
+    return _current_trace.set(RequestTrace(request_id, keep_timeline))
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """
+    Returns the trace of the current request, None if it is not traced.
+    """
+    return _current_trace.get()
+
+
+def end_trace(token: Token) -> None:
+    """
+    Stops tracing the request handled in the current context.
+    """
+    _current_trace.reset(token)
+
+
+def span(name: str):
+    """
+    Times a stage of the current request, a shared no-op when it is not traced.
+
+    Args:
+        name (str): The name of the stage (e.g. db_query, model_hydration).
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name)
+
+
+def annotate(**attributes: Any) -> None:
+    """
+    Adds attributes (e.g. short_key, outcome) to the summary of the current request.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def record_error(message: str) -> None:
+    """
+    Records the error message of the current request for its summary.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.error = message
+
+
+##########################
+## RequestSummaryLogger ##
+##########################
+
+
+class RequestSummaryLogger:
+    """
+    Writes one structured JSON line per request, serialized with orjson, carrying the
+    request_id, route, status, duration and per-stage durations of the request.
+
+    Failed requests (status >= 400) are always logged, successful ones are sampled.
+    """
+
+    def __init__(self, logger, verbosity: str = "summary", success_sample_rate: float = 1.0) -> None:
+        """
+        Initializes the RequestSummaryLogger.
+
+        Args:
+            logger (Rotolog): The application logger lines are written to.
+            verbosity (str): "summary" for the stage totals, "detailed" to add the client host,
+                             the attributes and the ordered timeline of spans.
+            success_sample_rate (float): The share of successful requests that are logged.
+        """
+        self.logger = logger
+        self.detailed = verbosity == "detailed"
+        self.success_sample_rate = success_sample_rate
+
+    def start(self, request_id: str) -> Token:
+        """
+        Starts the trace of a request in the current context.
+        """
+        return start_trace(request_id, keep_timeline=self.detailed)
+
+    def log(
+        self,
+        trace: RequestTrace,
+        method: str,
+        route: str,
+        path: str,
+        status_code: int,
+        client_host: Optional[str] = None,
+    ) -> None:
+        """
+        Logs the summary line of a finished request.
+
+        Args:
+            trace (RequestTrace): The trace of the request.
+            method (str): The HTTP method of the request.
+            route (str): The matched route template (e.g. /{short_key}).
+            path (str): The path of the request.
+            status_code (int): The status code of the response.
+            client_host (Optional[str]): The client address, logged in detailed verbosity.
+        """
+        if status_code < 400 and self.success_sample_rate < 1 and random.random() >= self.success_sample_rate:
+            return
+
+        summary = {
+            "timestamp": datetime.now(),
+            "request_id": trace.request_id,
+            "method": method,
+            "route": route,
+            "path": path,
+            "status_code": status_code,
+            "duration_ms": trace.duration_ms(),
+            "stages_ms": trace.stage_timings_ms(),
+        }
+        if trace.error is not None:
+            summary["error"] = trace.error
+        if self.detailed:
+            summary["client_host"] = client_host
+            summary["attributes"] = trace.attributes
+            summary["timeline_ms"] = [
+                [name, round((started_at - trace.started_at) * 1000, 3), round((ended_at - started_at) * 1000, 3)]
+                for name, started_at, ended_at in trace.timeline
+            ]
+
+        message = orjson.dumps(summary, default=str).decode()
+        if status_code >= 500:
+            self.logger.error(message)
+        else:
+            self.logger.info(message)
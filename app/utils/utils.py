@@ -2,14 +2,26 @@
 ## Imports ##
 #############
 
+import asyncio
+import re
 import secrets
 import string
+from typing import Any, Awaitable, Dict, Pattern
+from urllib.parse import quote
+
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from pymongo.errors import ExecutionTimeout
 
 ######################
 ## Helper Functions ##
 ######################
 
 
+# Characters system generated short keys are made of
+SHORT_KEY_ALPHABET = string.ascii_letters + string.digits
+
+
 def create_short_key(length: int = 5) -> str:
     """
     Generate a random alphanumeric key of specified length.
@@ -21,8 +33,79 @@ def create_short_key(length: int = 5) -> str:
         str: A randomly generated alphanumeric key.
     """
 
-    # define characters to choose from
-    chars = string.ascii_letters + string.digits
     # generate the random key
-    random_key = "".join(secrets.choice(chars) for _ in range(length))
+    random_key = "".join(secrets.choice(SHORT_KEY_ALPHABET) for _ in range(length))
     return random_key
+
+
+def compile_key_grammar(alphabet: str, min_length: int, max_length: int) -> Pattern[str]:
+    """
+    Compile the grammar of keys made of the characters of an alphabet, within length bounds.
+
+    Args:
+        alphabet (str): The characters keys are made of.
+        min_length (int): The shortest key.
+        max_length (int): The longest key.
+
+    Returns:
+        Pattern[str]: The compiled grammar, to be matched with fullmatch.
+    """
+
+    return re.compile(f"[{re.escape(alphabet)}]{{{min_length},{max_length}}}")
+
+
+def redirect_cache_headers(max_age: int) -> Dict[str, str]:
+    """
+    Build the caching headers of a redirect.
+
+    Args:
+        max_age (int): The Cache-Control max-age in seconds, 0 forbids caching without
+                       revalidation (otherwise browsers cache 301 and 308 redirects
+                       heuristically, for as long as they like).
+
+    Returns:
+        Dict[str, str]: The headers.
+    """
+
+    if not max_age:
+        return {"Cache-Control": "no-cache"}
+    return {"Cache-Control": f"public, max-age={max_age}"}
+
+
+def redirect_location(target_url: str) -> str:
+    """
+    Build the Location header value of a redirect, percent-encoded the way Starlette's
+    RedirectResponse encodes it (spaces, non ASCII characters, CR and LF included).
+
+    Args:
+        target_url (str): The target URL.
+
+    Returns:
+        str: The header value.
+    """
+
+    return quote(target_url, safe=":/%#?=@[]!$&'()*+,;")
+
+
+async def run_with_deadline(operation: Awaitable[Any], timeout_ms: int) -> Any:
+    """
+    Await a database operation, giving up once its deadline has passed.
+
+    Args:
+        operation (Awaitable[Any]): The database operation to await.
+        timeout_ms (int): The client side deadline in milliseconds.
+
+    Returns:
+        Any: The result of the operation.
+
+    Raises:
+        HTTPException: 504 if the deadline passed on the client or the server (maxTimeMS).
+    """
+
+    try:
+        return await asyncio.wait_for(operation, timeout_ms / 1000)
+    except (asyncio.TimeoutError, ExecutionTimeout) as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="database deadline exceeded"
+        ) from e
@@ -0,0 +1,73 @@
+"""
+Compare redirects served by the FastAPI route with redirects served by the raw ASGI
+fast lane, in-process on a single core.
+
+    python benchmarks/bench_redirect_fast_lane.py --requests 20000 --concurrency 64
+    python benchmarks/bench_redirect_fast_lane.py --mongo-uri mongodb://localhost:27017
+
+Without --mongo-uri the UrlMappings collection is an in-memory stand-in, whose own cost
+is part of both measurements. rps_per_core is requests per CPU second of this process.
+"""
+
+#############
+## Imports ##
+#############
+
+import argparse
+import asyncio
+import random
+
+import orjson
+
+from common import load_app, run_load, running, seed_url_mappings, url_mapping_document
+
+
+###############
+## Benchmark ##
+###############
+
+
+async def main(args: argparse.Namespace) -> None:
+
+    app_module = load_app(
+        mongo_uri=args.mongo_uri,
+        settings={
+            "REDIRECT_FAST_LANE_ENABLED": "true",
+            "ADMISSION_CONTROL_ENABLED": "false",
+            "DB_HEDGED_READS_ENABLED": "false",
+        },
+    )
+    from app.utils.utils import create_short_key
+
+    async with running(app_module):
+
+        short_keys = [create_short_key(6) for _ in range(args.keys)]
+        await seed_url_mappings(
+            app_module,
+            [url_mapping_document(app_module, key, f"https://example.com/{key}") for key in short_keys]
+        )
+
+        requests = [("GET", f"/{random.choice(short_keys)}", [], b"") for _ in range(args.requests)]
+
+        # Warm up both lanes before measuring
+        for asgi_app in (app_module.app, app_module.asgi_app):
+            await run_load(asgi_app, requests[:args.concurrency * 10], args.concurrency)
+
+        results = {
+            "fastapi_route": await run_load(app_module.app, requests, args.concurrency),
+            "fast_lane": await run_load(app_module.asgi_app, requests, args.concurrency),
+        }
+        results["speedup_per_core"] = round(
+            results["fast_lane"]["rps_per_core"] / results["fastapi_route"]["rps_per_core"], 2
+        )
+
+    print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=None, help="MongoDB to benchmark against, in-memory stand-in if omitted")
+    parser.add_argument("--keys", type=int, default=100, help="number of seeded short keys")
+    parser.add_argument("--requests", type=int, default=10000, help="number of measured requests per lane")
+    parser.add_argument("--concurrency", type=int, default=32, help="number of concurrent callers")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,230 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Make the app package importable when a benchmark is run as a script
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+#####################
+## App Under Bench ##
+#####################
+
+
+def load_app(mongo_uri: Optional[str] = None, settings: Optional[Dict[str, str]] = None):
+    """
+    Import the app package against a benchmark database.
+
+    The motor client class is swapped before the import, since DatabaseClient builds its
+    client from the configured credentials at import time: a real client on mongo_uri
+    (e.g. a local mongod), or the in-memory stand-in of memory_store when mongo_uri is None.
+
+    Args:
+        mongo_uri (Optional[str]): URI of the MongoDB server to benchmark against.
+        settings (Optional[Dict[str, str]]): Settings overrides, as environment variables.
+
+    Returns:
+        module: The imported app package.
+    """
+
+    import motor.motor_asyncio
+
+    motor_client_class = motor.motor_asyncio.AsyncIOMotorClient
+    if mongo_uri:
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: motor_client_class(mongo_uri, **kwargs)
+    else:
+        from memory_store import MemoryClient
+        motor.motor_asyncio.AsyncIOMotorClient = MemoryClient
+
+    # Fall back to the sample config and keep benchmark logs out of the configured log file
+    os.environ.setdefault("CONFIG_PATH", os.path.join(ROOT_DIR, "docs", ".env_sample"))
+    os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "url_shortener_bench", "events.log"))
+    os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.gettempdir(), "url_shortener_bench", "url_shortener.db"))
+    os.environ.update(settings or {})
+
+    try:
+        import app
+    finally:
+        motor.motor_asyncio.AsyncIOMotorClient = motor_client_class
+
+    return app
+
+
+@asynccontextmanager
+async def running(app_module):
+    """
+    Run the lifespan of the app (database connection) around a benchmark.
+    """
+    async with app_module.app.router.lifespan_context(app_module.app):
+        yield
+
+
+async def seed_url_mappings(app_module, documents: List[dict]) -> None:
+    """
+    Replace the content of the url mappings collections (of every shard) or of the SQLite
+    url mappings table with the given documents, inserted like shorten_url inserts them.
+    """
+    if app_module.config.storage_backend == "sqlite":
+        from app.core.models.models import UrlMappingRecord
+
+        storage_backend = app_module.storage_backend
+        storage_backend.connection.execute("DELETE FROM url_mappings")
+        for document in documents:
+            await storage_backend.insert(UrlMappingRecord.model_validate(document))
+        return
+
+    database_client = app_module.database_client
+    for shard in database_client.all_shards():
+        await shard.url_mappings.delete_many({})
+        await shard.url_mapping_routes.delete_many({})
+
+    for document in documents:
+        await database_client.insert_url_mapping(document)
+
+
+def url_mapping_document(app_module, short_key: str, target_url: str, is_custom_key: bool = False) -> dict:
+    """
+    Build a raw UrlMappings document as shorten_url would insert it.
+    """
+    return {
+        "target_url": target_url,
+        "short_key": short_key,
+        "hits": 0,
+        "is_active": True,
+        "is_custom_key": is_custom_key,
+        "tags": [],
+        "app_version": app_module.config.app_version,
+    }
+
+
+################
+## ASGI Calls ##
+################
+
+
+async def asgi_request(
+    asgi_app,
+    method: str,
+    path: str,
+    headers: Iterable[Tuple[bytes, bytes]] = (),
+    body: bytes = b"",
+) -> int:
+    """
+    Send one request to an ASGI application in-process, without a server or HTTP client.
+
+    Returns:
+        int: The status code of the response.
+    """
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"content-length", str(len(body)).encode()), *headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    request_sent = False
+    response_sent = asyncio.Event()
+    status_code = 0
+
+    async def receive() -> dict:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_sent.set()
+
+    await asgi_app(scope, receive, send)
+    return status_code
+
+
+###########
+## Stats ##
+###########
+
+
+def percentile(ordered: List[float], quantile: float) -> float:
+    """
+    Nearest rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * quantile))]
+
+
+async def run_load(
+    asgi_app,
+    requests: List[Tuple[str, str, List[Tuple[bytes, bytes]], bytes]],
+    concurrency: int,
+) -> dict:
+    """
+    Replay requests against an ASGI application with a fixed number of concurrent callers.
+
+    Args:
+        asgi_app: The ASGI application.
+        requests (List[Tuple]): (method, path, headers, body) of every request, in order.
+        concurrency (int): The number of concurrent callers.
+
+    Returns:
+        dict: Throughput, requests per CPU second, latency percentiles and status counts.
+    """
+
+    latencies: List[float] = []
+    status_codes: Dict[int, int] = {}
+    next_request = iter(requests)
+
+    async def caller() -> None:
+        for method, path, headers, body in next_request:
+            started_at = time.perf_counter()
+            status_code = await asgi_request(asgi_app, method, path, headers, body)
+            latencies.append(time.perf_counter() - started_at)
+            status_codes[status_code] = status_codes.get(status_code, 0) + 1
+
+    wall_started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    cpu_seconds = time.process_time() - cpu_started_at
+    wall_seconds = time.perf_counter() - wall_started_at
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds else 0.0,
+        "rps_per_core": round(len(latencies) / cpu_seconds, 1) if cpu_seconds else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "p999": round(percentile(latencies, 0.999) * 1000, 3),
+        },
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+    }
@@ -0,0 +1,361 @@
+"""
+In-memory stand-in for the motor client, covering the subset of the motor API that
+Beanie and the app use on UrlMappings (and IdempotencyRecords).
+
+Documents live in a dict by _id. Every indexed field gets a hash index, so equality and
+$in lookups on short_key or target_url cost O(1) like they do on an indexed collection,
+instead of the full scans of a generic mock. Filters support equality, $in, $ne and
+$exists on top level fields; updates support $set, $unset and $inc.
+"""
+
+#############
+## Imports ##
+#############
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+
+#############
+## Helpers ##
+#############
+
+
+def _copy(document: dict) -> dict:
+    """
+    Copy a document deeply enough that callers cannot mutate the stored one.
+    """
+    return {key: list(value) if isinstance(value, list) else value for key, value in document.items()}
+
+
+def _matches(document: dict, filter: dict) -> bool:
+    """
+    Whether a document matches a filter of top level field conditions.
+    """
+    for field, condition in filter.items():
+        value = document.get(field)
+        if isinstance(condition, dict) and condition and next(iter(condition)).startswith("$"):
+            for operator, operand in condition.items():
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$exists" and (field in document) != bool(operand):
+                    return False
+                if operator not in ("$in", "$ne", "$exists"):
+                    raise NotImplementedError(f"memory store does not support {operator}")
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(document: dict, projection: Optional[Any]) -> dict:
+    """
+    Apply an inclusion or exclusion projection.
+    """
+    if not projection:
+        return _copy(document)
+    if not isinstance(projection, dict):
+        projection = {field: 1 for field in projection}
+
+    included = {field for field, flag in projection.items() if flag and field != "_id"}
+    if included:
+        projected = {field: document[field] for field in included if field in document}
+        if projection.get("_id", 1):
+            projected["_id"] = document["_id"]
+        return _copy(projected)
+
+    excluded = {field for field, flag in projection.items() if not flag}
+    return _copy({field: value for field, value in document.items() if field not in excluded})
+
+
+def _apply_update(document: dict, update: dict) -> dict:
+    """
+    Apply $set, $unset and $inc operators to a copy of a document.
+    """
+    updated = dict(document)
+    for operator, fields in update.items():
+        for field, value in fields.items():
+            if operator == "$set":
+                updated[field] = value
+            elif operator == "$unset":
+                updated.pop(field, None)
+            elif operator == "$inc":
+                updated[field] = updated.get(field, 0) + value
+            else:
+                raise NotImplementedError(f"memory store does not support {operator}")
+    return updated
+
+
+#####################
+## Motor Stand-Ins ##
+#####################
+
+
+class MemoryCursor:
+    """
+    Stand-in for AsyncIOMotorCursor over an already evaluated result.
+    """
+
+    def __init__(self, documents: List[dict]) -> None:
+        self._documents = documents
+        self._limit = 0
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._documents = self._documents[skip:]
+        return self
+
+    def sort(self, *args, **kwargs) -> "MemoryCursor":
+        return self
+
+    def _result(self) -> List[dict]:
+        return self._documents[:self._limit] if self._limit else self._documents
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        documents = self._result()
+        return documents[:length] if length else documents
+
+    def __aiter__(self):
+        self._iterator = iter(self._result())
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MemoryCollection:
+    """
+    Stand-in for AsyncIOMotorCollection with hash indexes on indexed fields.
+    """
+
+    def __init__(self, database: "MemoryDatabase", name: str) -> None:
+        self.database = database
+        self.name = name
+        self._documents: Dict[Any, dict] = {}
+        self._indexes: Dict[str, dict] = {"_id_": {"key": [("_id", 1)], "unique": True}}
+        # field -> value -> set of _id, for the first field of every index
+        self._lookup: Dict[str, Dict[Any, set]] = {}
+        self._unique_fields: set = set()
+
+    def with_options(self, **kwargs) -> "MemoryCollection":
+        return self
+
+    # Indexes
+
+    async def index_information(self) -> dict:
+        return {name: dict(index) for name, index in self._indexes.items()}
+
+    async def create_indexes(self, indexes: Iterable, **kwargs) -> List[str]:
+        names = []
+        for index in indexes:
+            document = index.document
+            key = list(document["key"].items())
+            name = document.get("name") or "_".join(f"{field}_{direction}" for field, direction in key)
+            self._indexes[name] = {"key": key, "unique": document.get("unique", False)}
+
+            field = key[0][0]
+            if field not in self._lookup:
+                self._lookup[field] = {}
+                for _id, stored in self._documents.items():
+                    self._lookup[field].setdefault(stored.get(field), set()).add(_id)
+            if document.get("unique") and len(key) == 1:
+                self._unique_fields.add(field)
+            names.append(name)
+        return names
+
+    async def create_index(self, keys, **kwargs) -> str:
+        from pymongo import IndexModel
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def drop_index(self, name: str, **kwargs) -> None:
+        self._indexes.pop(name, None)
+
+    async def drop(self, **kwargs) -> None:
+        self._documents.clear()
+        for values in self._lookup.values():
+            values.clear()
+
+    # Reads
+
+    def _candidates(self, filter: dict) -> Iterable[dict]:
+        """
+        Documents that may match a filter, narrowed down with a hash index if possible.
+        """
+        if "_id" in filter and not isinstance(filter["_id"], dict):
+            document = self._documents.get(filter["_id"])
+            return [document] if document else []
+
+        for field, condition in filter.items():
+            lookup = self._lookup.get(field)
+            if lookup is None:
+                continue
+            if isinstance(condition, dict) and "$in" in condition:
+                _ids = set().union(*(lookup.get(value, ()) for value in condition["$in"]))
+            elif not isinstance(condition, dict):
+                _ids = lookup.get(condition, ())
+            else:
+                continue
+            return [self._documents[_id] for _id in _ids]
+
+        return list(self._documents.values())
+
+    def _find(self, filter: Optional[dict]) -> List[dict]:
+        filter = filter or {}
+        return [document for document in self._candidates(filter) if _matches(document, filter)]
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[Any] = None, *args, **kwargs) -> Optional[dict]:
+        documents = self._find(filter)
+        return _project(documents[0], projection) if documents else None
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[Any] = None, *args, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor([_project(document, projection) for document in self._find(filter)])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        return len(self._find(filter))
+
+    # Writes
+
+    def _store(self, document: dict, previous: Optional[dict] = None) -> None:
+        """
+        Store a document, keeping the hash indexes and unique constraints.
+        """
+        for field in self._unique_fields:
+            value = document.get(field)
+            if previous is not None and previous.get(field) == value:
+                continue
+            if value is not None and self._lookup[field].get(value):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+
+        if previous is not None:
+            for field, lookup in self._lookup.items():
+                lookup.get(previous.get(field), set()).discard(previous["_id"])
+
+        self._documents[document["_id"]] = document
+        for field, lookup in self._lookup.items():
+            lookup.setdefault(document.get(field), set()).add(document["_id"])
+
+    async def insert_one(self, document: dict, *args, **kwargs) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._store(_copy(document))
+        return InsertOneResult(document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: Iterable[dict], *args, **kwargs) -> InsertManyResult:
+        inserted_ids = [(await self.insert_one(document)).inserted_id for document in documents]
+        return InsertManyResult(inserted_ids, acknowledged=True)
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: Optional[Any] = None,
+        sort=None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        *args,
+        **kwargs,
+    ) -> Optional[dict]:
+        documents = self._find(filter)
+        if not documents:
+            if not upsert:
+                return None
+            seed = {field: value for field, value in filter.items() if not isinstance(value, dict)}
+            updated = _apply_update(seed, update)
+            updated.setdefault("_id", ObjectId())
+            self._store(updated)
+            return _project(updated, projection) if return_document == ReturnDocument.AFTER else None
+
+        previous = documents[0]
+        updated = _apply_update(previous, update)
+        self._store(updated, previous)
+        return _project(updated if return_document == ReturnDocument.AFTER else previous, projection)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, *args, **kwargs) -> UpdateResult:
+        matched = bool(self._find(filter))
+        await self.find_one_and_update(filter, update, upsert=upsert)
+        return UpdateResult({"n": 1 if matched or upsert else 0, "nModified": int(matched)}, acknowledged=True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, *args, **kwargs) -> UpdateResult:
+        documents = self._find(filter)
+        if not documents and not upsert:
+            return UpdateResult({"n": 0, "nModified": 0}, acknowledged=True)
+        previous = documents[0] if documents else None
+        replacement = {**_copy(replacement), "_id": previous["_id"] if previous else replacement.get("_id", ObjectId())}
+        self._store(replacement, previous)
+        return UpdateResult({"n": 1, "nModified": int(previous is not None)}, acknowledged=True)
+
+    async def bulk_write(self, requests: Iterable, ordered: bool = True, *args, **kwargs) -> BulkWriteResult:
+        matched = 0
+        for request in requests:
+            # UpdateOne operations only, the ones the app sends
+            result = await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            matched += result.matched_count
+        return BulkWriteResult({"nMatched": matched, "nModified": matched, "upserted": []}, acknowledged=True)
+
+    async def delete_many(self, filter: dict, *args, **kwargs) -> DeleteResult:
+        documents = self._find(filter)
+        for document in documents:
+            del self._documents[document["_id"]]
+            for field, lookup in self._lookup.items():
+                lookup.get(document.get(field), set()).discard(document["_id"])
+        return DeleteResult({"n": len(documents)}, acknowledged=True)
+
+
+class MemoryDatabase:
+    """
+    Stand-in for AsyncIOMotorDatabase.
+    """
+
+    def __init__(self, client: "MemoryClient", name: str) -> None:
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    async def command(self, command: dict, *args, **kwargs) -> dict:
+        if "buildInfo" in command:
+            return {"version": "7.0.0", "ok": 1.0}
+        return {"ok": 1.0}
+
+    async def list_collection_names(self, *args, **kwargs) -> List[str]:
+        return list(self._collections)
+
+
+class MemoryClient:
+    """
+    Stand-in for AsyncIOMotorClient.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def get_io_loop(self):
+        import asyncio
+        return asyncio.get_running_loop()
+
+    def close(self) -> None:
+        pass
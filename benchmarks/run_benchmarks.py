@@ -0,0 +1,213 @@
+"""
+Reproducible load-test scenarios for the app, driven in-process over ASGI.
+
+    python benchmarks/run_benchmarks.py --output bench_output.json
+    python benchmarks/run_benchmarks.py --mongo-uri mongodb://localhost:27017 --scenario redirect_zipf
+    python benchmarks/run_benchmarks.py --set REDIRECT_FAST_LANE_ENABLED=true
+
+Scenarios:
+    redirect_zipf          GET /{short_key} over seeded keys with Zipf distributed popularity
+    not_found_scan         GET /{short_key} for keys that do not exist (404 scanning traffic)
+    shorten_burst          POST /shorten_url bursts where many requests share a target_url
+    custom_key_collisions  POST /shorten_url with custom keys, most of them already taken
+
+Every scenario starts from a freshly seeded UrlMappings collection and uses the same
+random seed, so two runs with the same arguments replay the same requests. Results are
+printed (and optionally written) as one JSON document with throughput and p50/p99/p999
+latency per scenario.
+"""
+
+#############
+## Imports ##
+#############
+
+import argparse
+import asyncio
+import itertools
+import platform
+import random
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import orjson
+
+from common import ROOT_DIR, load_app, run_load, running, seed_url_mappings, url_mapping_document
+
+
+###############
+## Scenarios ##
+###############
+
+Request = Tuple[str, str, List[Tuple[bytes, bytes]], bytes]
+
+# Same alphabet as app.utils.utils.SHORT_KEY_ALPHABET, which cannot be imported before load_app
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+CUSTOM_HEADERS = JSON_HEADERS + [(b"x-custom-shorten", b"true")]
+
+
+def seeded_keys(args: argparse.Namespace) -> List[str]:
+    """
+    The short keys seeded before every scenario, fixed by the random seed.
+    """
+    rng = random.Random(args.seed)
+    return ["".join(rng.choice(ALPHABET) for _ in range(6)) for _ in range(args.keys)]
+
+
+def redirect_zipf(args: argparse.Namespace, rng: random.Random, short_keys: List[str]) -> List[Request]:
+    """
+    Redirects where the popularity of the n-th key is proportional to 1 / n^s.
+    """
+    cum_weights = list(itertools.accumulate(1 / rank ** args.zipf_s for rank in range(1, len(short_keys) + 1)))
+    keys = rng.choices(short_keys, cum_weights=cum_weights, k=args.requests)
+    return [("GET", f"/{key}", [], b"") for key in keys]
+
+
+def not_found_scan(args: argparse.Namespace, rng: random.Random, short_keys: List[str]) -> List[Request]:
+    """
+    Redirects for random keys that were never created, like a scanner enumerating keys.
+    """
+    existing = set(short_keys)
+    requests = []
+    while len(requests) < args.requests:
+        key = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 8)))
+        if key not in existing:
+            requests.append(("GET", f"/{key}", [], b""))
+    return requests
+
+
+def shorten_burst(args: argparse.Namespace, rng: random.Random, short_keys: List[str]) -> List[Request]:
+    """
+    System key shorten requests drawn from a small pool of target URLs, so most of them
+    hit an existing mapping (200) and the rest create one (201).
+    """
+    pool_size = max(1, int(args.requests * args.duplicate_ratio))
+    requests = []
+    for _ in range(args.requests):
+        body = {
+            "target_url": f"https://example.com/burst/{rng.randrange(pool_size)}",
+            "tags": ["bench"],
+            "short_key_length": 7,
+        }
+        requests.append(("POST", "/shorten_url", JSON_HEADERS, orjson.dumps(body)))
+    return requests
+
+
+def custom_key_collisions(args: argparse.Namespace, rng: random.Random, short_keys: List[str]) -> List[Request]:
+    """
+    Custom key shorten requests for new target URLs, whose keys are mostly taken
+    (seeded keys or keys requested earlier), so most of them end in a 400.
+    """
+    fresh_keys = [f"custom{index}" for index in range(max(1, int(args.requests * (1 - args.collision_ratio))))]
+    requests = []
+    for index in range(args.requests):
+        key = rng.choice(short_keys) if rng.random() < args.collision_ratio else rng.choice(fresh_keys)
+        body = {
+            "target_url": f"https://example.com/custom/{index}",
+            "tags": ["bench"],
+            "custom_key": key,
+        }
+        requests.append(("POST", "/shorten_url", CUSTOM_HEADERS, orjson.dumps(body)))
+    return requests
+
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace, random.Random, List[str]], List[Request]]] = {
+    "redirect_zipf": redirect_zipf,
+    "not_found_scan": not_found_scan,
+    "shorten_burst": shorten_burst,
+    "custom_key_collisions": custom_key_collisions,
+}
+
+
+################
+## Benchmarks ##
+################
+
+
+def git_commit() -> str:
+    """
+    The commit the benchmark ran on, if the tree is a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args: argparse.Namespace) -> None:
+
+    settings = dict(setting.split("=", 1) for setting in args.set)
+    app_module = load_app(mongo_uri=args.mongo_uri, settings=settings)
+    short_keys = seeded_keys(args)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "mongodb" if args.mongo_uri else "memory",
+            "settings": settings,
+            # The features the numbers include, whatever the config file sets
+            "features": {
+                feature: getattr(app_module.config, feature)
+                for feature in (
+                    "redirect_fast_lane_enabled",
+                    "admission_control_enabled",
+                    "rate_limit_enabled",
+                    "db_hedged_reads_enabled",
+                    "short_key_grammar_enforced",
+                )
+            },
+            "keys": args.keys,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+
+    async with running(app_module):
+        for name in args.scenario or list(SCENARIOS):
+            await seed_url_mappings(
+                app_module,
+                [url_mapping_document(app_module, key, f"https://example.com/{key}") for key in short_keys]
+            )
+            requests = SCENARIOS[name](args, random.Random(args.seed), short_keys)
+
+            if args.warmup:
+                # Warm up, then reseed so the measurement starts from the seeded state
+                await run_load(app_module.asgi_app, requests[:args.warmup], args.concurrency)
+                await seed_url_mappings(
+                    app_module,
+                    [url_mapping_document(app_module, key, f"https://example.com/{key}") for key in short_keys]
+                )
+
+            results["scenarios"][name] = await run_load(app_module.asgi_app, requests, args.concurrency)
+
+    output = orjson.dumps(results, option=orjson.OPT_INDENT_2)
+    print(output.decode())
+    if args.output:
+        with open(args.output, "wb") as output_file:
+            output_file.write(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=None, help="MongoDB to benchmark against, in-memory stand-in if omitted")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="scenario to run (repeatable), all if omitted")
+    parser.add_argument("--keys", type=int, default=10000, help="number of seeded short keys")
+    parser.add_argument("--requests", type=int, default=5000, help="number of measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="number of concurrent callers")
+    parser.add_argument("--warmup", type=int, default=500, help="number of warm-up requests per scenario")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="exponent of the Zipf distribution of redirects")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="distinct target_urls per shorten_burst request")
+    parser.add_argument("--collision-ratio", type=float, default=0.8, help="share of custom keys that collide with seeded keys")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the generated traffic")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="settings override (repeatable)")
+    parser.add_argument("--output", default=None, help="file the JSON results are also written to")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,45 @@
+#############
+## Imports ##
+#############
+
+import argparse
+import asyncio
+import sys
+
+from app import short_key_grammar, storage_backend  # import the short key grammar and storage backend of the app module
+
+
+######################
+## Check Short Keys ##
+######################
+
+
+async def main(args: argparse.Namespace) -> int:
+
+    print(f"short key grammar: {short_key_grammar.pattern}")
+
+    checked = 0
+    outside = []
+    await storage_backend.connect()
+    try:
+        async for short_key in storage_backend.iter_short_keys():
+            checked += 1
+            if not short_key_grammar.fullmatch(short_key):
+                outside.append(short_key)
+    finally:
+        await storage_backend.disconnect()
+
+    print(f"{len(outside)} of {checked} short keys are outside the grammar")
+    for short_key in outside[:args.show]:
+        print(repr(short_key))
+
+    return 1 if outside else 0
+
+
+if __name__ == "__main__":
+
+    # Lists the stored short keys the short key grammar rejects, which would answer 404
+    # once short_key_grammar_enforced is set. Exits with 1 if there are any
+    parser = argparse.ArgumentParser(description="check stored short keys against the short key grammar")
+    parser.add_argument("--show", type=int, default=20, help="number of short keys outside the grammar printed")
+    sys.exit(asyncio.run(main(parser.parse_args())))
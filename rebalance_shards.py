@@ -0,0 +1,43 @@
+#############
+## Imports ##
+#############
+
+import argparse
+import asyncio
+
+from app import config, database_client, logger  # import the config, database client and logger of the app module
+from app.core.clients.shard_rebalancer import ShardRebalancer
+
+
+######################
+## Rebalance Shards ##
+######################
+
+
+async def main(args: argparse.Namespace) -> None:
+
+    if config.storage_backend != "mongo":
+        raise SystemExit(f"url mappings are stored by the {config.storage_backend} storage backend, not sharded")
+
+    rebalancer = ShardRebalancer(database_client, batch_size=args.batch_size, logger=logger)
+    print(f"shards: {list(database_client.shards)}, previous shards: {list(database_client.previous_shards)}")
+    print(f"hash space to move: {rebalancer.moved_share():.1%}")
+
+    try:
+        result = await rebalancer.run(backfill_routes=not args.skip_route_backfill)
+    finally:
+        await database_client.disconnect()
+
+    print(result)
+    if result["conflicts"]:
+        raise SystemExit(f"{result['conflicts']} conflicting documents were left in place, see the log for their keys")
+
+
+if __name__ == "__main__":
+
+    # Moves url mappings to the shards of db_shards, reading the configured db_shards_previous
+    # layout as well, while the app keeps serving from both layouts
+    parser = argparse.ArgumentParser(description="move url mappings to the shards of the db_shards setting")
+    parser.add_argument("--batch-size", type=int, default=500, help="number of documents read from a shard per batch")
+    parser.add_argument("--skip-route-backfill", action="store_true", help="do not create missing target_url routes")
+    asyncio.run(main(parser.parse_args()))
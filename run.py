@@ -2,13 +2,246 @@
 ## Imports ##
 #############
 
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from multiprocessing.connection import wait
+from typing import Dict, Optional
+
 import uvicorn  # import uvicorn for running the ASGI application
-from app import app  # import the ASGI application object from the app module
+from app import config, logger  # import the settings and logger of the app module
+
+
+#############
+## Workers ##
+#############
+
+# Workers are started with spawn, so each one imports the app (and opens its own database
+# connections) instead of inheriting the supervisor's state through fork
+mp_context = multiprocessing.get_context("spawn")
+
+# A worker exiting sooner than this after starting is restarted after a delay,
+# so a worker that cannot start does not restart in a tight loop
+MIN_WORKER_UPTIME_SECONDS = 1.0
+
+
+def worker_log_file(worker_id: int) -> str:
+    """
+    The log file of a worker: log_file with the worker slot before its extension, since
+    a RotatingFileHandler cannot safely rotate a file other processes write to.
+
+    Args:
+        worker_id (int): The slot of the worker.
+
+    Returns:
+        str: The path of the worker's log file.
+    """
+    root, extension = os.path.splitext(config.log_file)
+    return f"{root}.worker-{worker_id}{extension}"
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Binds a listening socket with SO_REUSEPORT, so every worker has its own socket on the
+    same port and the kernel balances incoming connections across them.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        backlog (int): The maximum number of pending connections.
+
+    Returns:
+        socket.socket: The listening socket.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def server_config() -> uvicorn.Config:
+    """
+    The uvicorn config of a worker, with uvloop and httptools selected explicitly.
+    """
+    return uvicorn.Config(
+        "app:asgi_app",
+        host=config.server_host,
+        port=config.server_port,
+        loop="uvloop",
+        http="httptools",
+        backlog=config.server_backlog,
+        timeout_keep_alive=config.server_keep_alive_timeout,
+        timeout_graceful_shutdown=config.server_graceful_shutdown_timeout,
+        # Requests are already logged by the app's summary line
+        access_log=False,
+    )
+
+
+def serve_worker(worker_id: int) -> None:
+    """
+    Runs one worker: a uvicorn server on its own SO_REUSEPORT socket. uvicorn handles
+    SIGTERM by closing the socket and draining open connections before exiting.
+
+    Args:
+        worker_id (int): The slot of the worker, for logging.
+    """
+    sock = bind_socket(config.server_host, config.server_port, config.server_backlog)
+    logger.info(f"worker {worker_id} (pid {os.getpid()}) listening on {config.server_host}:{config.server_port}")
+    uvicorn.Server(server_config()).run(sockets=[sock])
+
+
+################
+## Supervisor ##
+################
+
+
+class WorkerSupervisor:
+    """
+    Starts the worker processes, restarts the ones that crash and stops them all,
+    letting them drain their connections, on SIGTERM or SIGINT.
+    """
+
+    def __init__(self, workers: int) -> None:
+        """
+        Initializes the WorkerSupervisor.
+
+        Args:
+            workers (int): The number of worker processes.
+        """
+        self.workers = workers
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.started_at: Dict[int, float] = {}
+        self.should_exit = False
+
+    def start_worker(self, worker_id: int) -> None:
+        """
+        Starts the worker of a slot.
+        """
+        process = mp_context.Process(target=serve_worker, args=(worker_id,), name=f"worker-{worker_id}")
+
+        # A spawned worker reads its settings from the environment it is started with
+        log_file = os.environ.get("LOG_FILE")
+        os.environ["LOG_FILE"] = worker_log_file(worker_id)
+        try:
+            process.start()
+        finally:
+            if log_file is None:
+                del os.environ["LOG_FILE"]
+            else:
+                os.environ["LOG_FILE"] = log_file
+        self.processes[worker_id] = process
+        self.started_at[worker_id] = time.monotonic()
+
+    def handle_exit(self, signum: int, frame) -> None:
+        """
+        Signal handler asking the supervisor to stop.
+        """
+        self.should_exit = True
+
+    def run(self) -> None:
+        """
+        Runs the workers until SIGTERM or SIGINT.
+        """
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGINT, self.handle_exit)
+
+        for worker_id in range(self.workers):
+            self.start_worker(worker_id)
+        logger.info(f"supervisor (pid {os.getpid()}) started {self.workers} workers")
+
+        while not self.should_exit:
+            wait([process.sentinel for process in self.processes.values()], timeout=1.0)
+            for worker_id, process in list(self.processes.items()):
+                if process.is_alive() or self.should_exit:
+                    continue
+
+                logger.error(f"worker {worker_id} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+                if time.monotonic() - self.started_at[worker_id] < MIN_WORKER_UPTIME_SECONDS:
+                    time.sleep(MIN_WORKER_UPTIME_SECONDS)
+                self.start_worker(worker_id)
+
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """
+        Sends SIGTERM to every worker and waits for them to drain their connections,
+        killing the ones still running after the graceful shutdown timeout.
+        """
+        logger.info(f"supervisor stopping {len(self.processes)} workers")
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + config.server_graceful_shutdown_timeout + 5
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error(f"worker {process.name} (pid {process.pid}) did not drain in time, killing it")
+                process.kill()
+                process.join()
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    The number of CPUs the container's cgroup quota allows (cgroup v2 cpu.max, or v1
+    cpu.cfs_quota_us and cpu.cfs_period_us), None if there is no quota.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as cfs_quota, \
+                    open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as cfs_period:
+                quota, period = cfs_quota.read().strip(), cfs_period.read().strip()
+        except OSError:
+            return None
+
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+def worker_count(workers: int) -> int:
+    """
+    The number of workers to start, when 0 one per core available to the process,
+    bounded by the CPU quota of its container.
+    """
+    if workers > 0:
+        return workers
+
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+
+    cpu_limit = cgroup_cpu_limit()
+    if cpu_limit is not None:
+        cores = min(cores, math.ceil(cpu_limit))
+    return max(1, cores)
+
 
 #####################
 ## Run Application ##
 #####################
 if __name__ == "__main__":
 
-    # listen on all network interfaces (0.0.0.0) and port 8000
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if not hasattr(socket, "SO_REUSEPORT"):
+        # Platforms without SO_REUSEPORT (e.g. Windows) run a single process
+        uvicorn.run(
+            "app:asgi_app",
+            host=config.server_host,
+            port=config.server_port,
+            backlog=config.server_backlog,
+            timeout_keep_alive=config.server_keep_alive_timeout,
+            timeout_graceful_shutdown=config.server_graceful_shutdown_timeout,
+            access_log=False,
+        )
+    else:
+        WorkerSupervisor(worker_count(config.server_workers)).run()
@@ -0,0 +1,21 @@
+#############
+## Imports ##
+#############
+
+import os
+import sys
+import tempfile
+
+
+# Make the app package importable, and import it against the sample config with the
+# sqlite storage backend, so no MongoDB is needed and logs stay out of the configured file
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+TEST_DIR = os.path.join(tempfile.gettempdir(), "url_shortener_tests")
+
+os.environ.setdefault("CONFIG_PATH", os.path.join(ROOT_DIR, "docs", ".env_sample"))
+os.environ.setdefault("LOG_FILE", os.path.join(TEST_DIR, "events.log"))
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(TEST_DIR, "url_shortener.db"))
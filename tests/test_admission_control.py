@@ -0,0 +1,57 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import List
+
+from app.core.middleware.admission_control import (
+    AdaptiveConcurrencyLimit,
+    AdmissionControlMiddleware,
+    TokenBucketRateLimiter,
+)
+
+
+###########
+## Tests ##
+###########
+
+
+def get_many(middleware: AdmissionControlMiddleware, path: str, count: int) -> List[int]:
+    """
+    Sends count GET requests from one client, returns the status codes of the responses.
+    """
+    status_codes = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status_codes.append(message["status"])
+
+    async def main():
+        middleware.app = app
+        for _ in range(count):
+            await middleware({"type": "http", "method": "GET", "path": path, "client": ("10.0.0.1", 1)}, None, send)
+
+    asyncio.run(main())
+    return status_codes
+
+
+def test_rate_limits_apply_without_a_concurrency_limit() -> None:
+    middleware = AdmissionControlMiddleware(None, rate_limiter=TokenBucketRateLimiter(rate=0.001, burst=3))
+
+    assert get_many(middleware, "/abc123", 5) == [200, 200, 200, 429, 429]
+    assert get_many(middleware, "/ping", 2) == [200, 200]
+
+
+def test_concurrency_limit_applies_without_rate_limits() -> None:
+    concurrency_limit = AdaptiveConcurrencyLimit(
+        initial_limit=16, min_limit=16, max_limit=16, target_latency_ms=50, backoff_ratio=0.9, low_priority_share=0.5
+    )
+    middleware = AdmissionControlMiddleware(None, concurrency_limit=concurrency_limit)
+
+    assert get_many(middleware, "/abc123", 5) == [200] * 5
+    assert concurrency_limit.in_flight == 0
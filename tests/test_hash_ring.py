@@ -0,0 +1,60 @@
+#############
+## Imports ##
+#############
+
+import pytest
+
+from app.core.clients.hash_ring import HASH_SPACE, HashRing, hash_key
+
+
+###########
+## Tests ##
+###########
+
+
+KEYS = [f"key{index}" for index in range(5000)]
+
+
+def test_node_for_is_stable_and_uses_every_node() -> None:
+    ring = HashRing(["s0", "s1", "s2"])
+    same_ring = HashRing(["s2", "s0", "s1"])
+
+    owners = [ring.node_for(key) for key in KEYS]
+    assert owners == [same_ring.node_for(key) for key in KEYS]
+    # 64 points per node keep every share near a third
+    for node in ring.nodes:
+        assert 0.2 < owners.count(node) / len(KEYS) < 0.47
+
+
+def test_an_empty_ring_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_adding_a_node_only_moves_keys_to_it() -> None:
+    ring = HashRing(["s0", "s1", "s2"])
+    new_ring = HashRing(["s0", "s1", "s2", "s3"])
+
+    moved = [key for key in KEYS if ring.node_for(key) != new_ring.node_for(key)]
+    assert all(new_ring.node_for(key) == "s3" for key in moved)
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+
+
+def test_moved_ranges_hold_exactly_the_moved_keys() -> None:
+    ring = HashRing(["s0", "s1", "s2"])
+    new_ring = HashRing(["s0", "s1", "s3"])
+    moved_ranges = ring.moved_ranges(new_ring)
+
+    def moved_range(key: str):
+        point = hash_key(key)
+        for start, end, node, other_node in moved_ranges:
+            # The first range wraps around the end of the hash space
+            if start < point <= end or start < point - HASH_SPACE <= end:
+                return node, other_node
+        return None
+
+    for key in KEYS:
+        node, other_node = ring.node_for(key), new_ring.node_for(key)
+        assert moved_range(key) == ((node, other_node) if node != other_node else None)
+
+    assert ring.moved_ranges(HashRing(["s0", "s1", "s2"])) == []
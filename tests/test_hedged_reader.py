@@ -0,0 +1,82 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import Optional
+
+import pytest
+
+from app.core.clients.hedged_reader import HedgedReader
+
+
+###########
+## Tests ##
+###########
+
+
+class FakeCollection:
+    """
+    Answers find_one after a delay, with different delays and answers for hedge queries.
+    """
+
+    def __init__(self, delay: float, result, hedge_delay: float = 0, hedge_result=None) -> None:
+        self.delay = delay
+        self.result = result
+        self.hedge_delay = hedge_delay
+        self.hedge_result = hedge_result
+
+    def with_options(self, read_preference) -> "FakeCollection":
+        return FakeCollection(self.hedge_delay, self.hedge_result)
+
+    async def find_one(self, filter: dict, projection: Optional[dict] = None, max_time_ms: Optional[int] = None):
+        await asyncio.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def hedged_reader() -> HedgedReader:
+    return HedgedReader(enabled=True, quantile=0.5, min_delay_ms=10, refresh_every=1)
+
+
+def test_slow_original_query_latency_is_recorded_when_the_hedge_wins():
+    reader = hedged_reader()
+
+    async def main():
+        collection = FakeCollection(0.2, {"short_key": "original"}, hedge_result={"short_key": "hedge"})
+        assert await reader.find_one(collection, {}) == {"short_key": "hedge"}
+        assert reader.hedges_won == 1
+        assert not reader._latencies
+
+        # The original query keeps running and its latency is recorded once it completes
+        await asyncio.sleep(0.3)
+        assert reader._latencies and reader._latencies[0] >= 0.2
+        assert reader.hedge_delay >= 0.2
+
+    asyncio.run(main())
+
+
+def test_hedge_answers_when_both_complete_and_only_the_hedge_succeeded():
+    reader = hedged_reader()
+
+    async def main():
+        collection = FakeCollection(0.05, RuntimeError("primary failed"), hedge_delay=0.04, hedge_result={"short_key": "hedge"})
+        assert await reader.find_one(collection, {}) == {"short_key": "hedge"}
+
+    asyncio.run(main())
+
+
+def test_original_query_is_authoritative_when_the_hedge_misses():
+    reader = hedged_reader()
+
+    async def main():
+        collection = FakeCollection(0.05, {"short_key": "original"}, hedge_result=None)
+        assert await reader.find_one(collection, {}) == {"short_key": "original"}
+        assert reader.hedges_won == 0
+
+        failing = FakeCollection(0.05, RuntimeError("primary failed"), hedge_delay=0.1, hedge_result=RuntimeError("hedge failed"))
+        with pytest.raises(RuntimeError):
+            await reader.find_one(failing, {})
+
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import Dict, List
+
+from app.core.clients.hits_counter import HitsCounter
+
+
+###########
+## Tests ##
+###########
+
+
+class FakeStorageBackend:
+    """
+    Records the hits written, each write taking delay seconds.
+    """
+
+    def __init__(self, delay: float = 0) -> None:
+        self.delay = delay
+        self.writes: List[Dict[str, int]] = []
+
+    async def increment_hits(self, hits: Dict[str, int]) -> None:
+        await asyncio.sleep(self.delay)
+        self.writes.append(dict(hits))
+
+
+def test_hits_are_written_in_one_batch_per_interval() -> None:
+    async def scenario() -> None:
+        storage_backend = FakeStorageBackend()
+        hits_counter = HitsCounter(storage_backend, flush_interval_ms=20, write_timeout_ms=1000)
+        await hits_counter.start()
+
+        for short_key in ["abc", "abc", "def"] * 100:
+            hits_counter.count(short_key)
+        await asyncio.sleep(0.05)
+
+        assert storage_backend.writes == [{"abc": 200, "def": 100}]
+        await hits_counter.stop()
+
+    asyncio.run(scenario())
+
+
+def test_pending_hits_are_written_on_stop() -> None:
+    async def scenario() -> None:
+        storage_backend = FakeStorageBackend()
+        hits_counter = HitsCounter(storage_backend, flush_interval_ms=60000, write_timeout_ms=1000)
+        await hits_counter.start()
+
+        hits_counter.count("abc")
+        await hits_counter.stop()
+
+        assert storage_backend.writes == [{"abc": 1}]
+
+    asyncio.run(scenario())
+
+
+def test_a_slow_write_drops_its_hits() -> None:
+    async def scenario() -> None:
+        storage_backend = FakeStorageBackend(delay=1)
+        hits_counter = HitsCounter(storage_backend, flush_interval_ms=60000, write_timeout_ms=10)
+
+        hits_counter.count("abc")
+        hits_counter.count("abc")
+        await hits_counter.flush()
+
+        assert storage_backend.writes == []
+        assert hits_counter.stats() == {
+            "pending_short_keys": 0, "flushes": 1, "failed_flushes": 1, "dropped_hits": 2
+        }
+
+    asyncio.run(scenario())
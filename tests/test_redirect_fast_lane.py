@@ -0,0 +1,112 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import Dict, Tuple
+
+import app as app_module
+from app.core.middleware.redirect_fast_lane import RedirectFastLane
+from app.core.models.models import UrlMappingRecord
+from app.utils.utils import create_short_key
+
+
+###########
+## Tests ##
+###########
+
+
+async def get(asgi_app, path: str) -> Tuple[int, Dict[bytes, bytes]]:
+    """
+    Sends a GET request, returns the status code and headers of the response.
+    """
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # The request has no body, then the client stays connected
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await asgi_app(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"])
+
+
+def fast_lane() -> RedirectFastLane:
+    config = app_module.config
+    return RedirectFastLane(
+        app_module.app,
+        storage_backend=app_module.storage_backend,
+        summary_logger=app_module.request_summary_logger,
+        hits_counter=app_module.hits_counter,
+        key_pattern=app_module.short_key_grammar.pattern,
+        read_timeout_ms=config.db_read_timeout_ms,
+        redirect_status_code=config.redirect_status_code,
+        redirect_cache_max_age=config.redirect_cache_max_age,
+    )
+
+
+def test_fast_lane_location_matches_the_route() -> None:
+    async def scenario() -> None:
+        async with app_module.app.router.lifespan_context(app_module.app):
+            redirect_fast_lane = fast_lane()
+
+            for target_url in (
+                "https://example.com/a b/é?q=1&r=[2]#top",
+                "https://example.com/%41/\r\nSet-Cookie: a=b",
+            ):
+                short_key = create_short_key(8)
+                await app_module.storage_backend.insert(
+                    UrlMappingRecord(target_url=target_url, short_key=short_key, app_version="test")
+                )
+
+                route_status, route_headers = await get(app_module.app, f"/{short_key}")
+                fast_lane_status, fast_lane_headers = await get(redirect_fast_lane, f"/{short_key}")
+
+                assert route_status == fast_lane_status == app_module.config.redirect_status_code
+                assert fast_lane_headers[b"location"] == route_headers[b"location"]
+                assert b" " not in fast_lane_headers[b"location"]
+                assert b"\r" not in fast_lane_headers[b"location"]
+                fast_lane_headers[b"location"].decode("ascii")
+
+    asyncio.run(scenario())
+
+
+def test_fast_lane_counts_hits_with_the_next_flush() -> None:
+    async def scenario() -> None:
+        async with app_module.app.router.lifespan_context(app_module.app):
+            redirect_fast_lane = fast_lane()
+            storage_backend = app_module.storage_backend
+
+            short_key = create_short_key(8)
+            await storage_backend.insert(
+                UrlMappingRecord(target_url="https://example.com", short_key=short_key, app_version="test")
+            )
+
+            for _ in range(3):
+                status_code, _ = await get(redirect_fast_lane, f"/{short_key}")
+                assert status_code == app_module.config.redirect_status_code
+            assert (await storage_backend.get_by_key(short_key)).hits == 0
+
+            await app_module.hits_counter.flush()
+            assert (await storage_backend.get_by_key(short_key)).hits == 3
+
+    asyncio.run(scenario())
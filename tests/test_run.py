@@ -0,0 +1,42 @@
+#############
+## Imports ##
+#############
+
+import io
+
+import run
+
+
+###########
+## Tests ##
+###########
+
+
+def fake_open(files: dict):
+    def open(path, *args, **kwargs):
+        if path not in files:
+            raise FileNotFoundError(path)
+        return io.StringIO(files[path])
+    return open
+
+
+def test_cgroup_v2_quota_bounds_worker_count(monkeypatch):
+    monkeypatch.setattr(run, "open", fake_open({"/sys/fs/cgroup/cpu.max": "150000 100000\n"}), raising=False)
+    monkeypatch.setattr(run.os, "sched_getaffinity", lambda pid: set(range(64)), raising=False)
+
+    assert run.cgroup_cpu_limit() == 1.5
+    assert run.worker_count(0) == 2
+    assert run.worker_count(5) == 5
+
+
+def test_cgroup_v1_quota_and_no_quota(monkeypatch):
+    monkeypatch.setattr(run, "open", fake_open({
+        "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "400000\n",
+        "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n",
+    }), raising=False)
+    assert run.cgroup_cpu_limit() == 4
+
+    monkeypatch.setattr(run, "open", fake_open({"/sys/fs/cgroup/cpu.max": "max 100000\n"}), raising=False)
+    monkeypatch.setattr(run.os, "sched_getaffinity", lambda pid: set(range(3)), raising=False)
+    assert run.cgroup_cpu_limit() is None
+    assert run.worker_count(0) == 3
@@ -0,0 +1,162 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import List
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config import ShardSettings
+from app.core.clients import database_client as database_client_module
+from app.core.clients.database_client import DatabaseClient
+from app.core.clients.shard_rebalancer import ShardRebalancer
+
+
+###########
+## Tests ##
+###########
+
+
+SHARDS = [{"name": "s0", "collection_name": "um0"}, {"name": "s1", "collection_name": "um1"}]
+UNSHARDED = [{"name": "default"}]
+
+
+@pytest.fixture
+def mongo_client(monkeypatch) -> AsyncMongoMockClient:
+    """
+    One in memory MongoDB shared by every DatabaseClient of a test.
+    """
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(database_client_module, "AsyncIOMotorClient", lambda *args, **kwargs: client)
+    return client
+
+
+def database_client(shards: List[dict], previous_shards: List[dict]) -> DatabaseClient:
+    return DatabaseClient(
+        db_username="user",
+        db_password="password",
+        db_host="localhost",
+        db_port=None,
+        db_name="url_shortener",
+        url_mappings_collection_name="url_mappings",
+        url_mapping_routes_collection_name="url_mapping_routes",
+        shards=[ShardSettings(**settings) for settings in shards],
+        previous_shards=[ShardSettings(**settings) for settings in previous_shards],
+    )
+
+
+def url_mapping(index: int) -> dict:
+    return {
+        "short_key": f"key{index}",
+        "target_url": f"https://example.com/{index}",
+        "is_active": True,
+        "hits": index,
+    }
+
+
+class HitsDuringMove:
+    """
+    Wraps a collection so the document gains hits between its copy and its removal.
+    """
+
+    def __init__(self, collection, hits: int) -> None:
+        self.collection = collection
+        self.hits = hits
+
+    def __getattr__(self, name: str):
+        return getattr(self.collection, name)
+
+    async def find_one_and_delete(self, filter: dict):
+        await self.collection.update_one(filter, {"$inc": {"hits": self.hits}})
+        return await self.collection.find_one_and_delete(filter)
+
+
+def test_move_copies_removes_and_carries_over_hits(mongo_client) -> None:
+    async def scenario() -> None:
+        database = mongo_client["url_shortener"]
+        source, target = database["um0"], database["um1"]
+        _id = (await source.insert_one(url_mapping(5))).inserted_id
+
+        assert await ShardRebalancer._move(HitsDuringMove(source, hits=3), target, _id, "hits")
+
+        assert await source.find_one({"_id": _id}) is None
+        moved = await target.find_one({"_id": _id})
+        assert moved["short_key"] == "key5"
+        assert moved["hits"] == 5 + 3
+
+        # Moving it again (e.g. from a second process) is a no-op
+        assert not await ShardRebalancer._move(source, target, _id, "hits")
+        assert await target.count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_move_resumes_after_an_interrupted_copy(mongo_client) -> None:
+    async def scenario() -> None:
+        database = mongo_client["url_shortener"]
+        source, target = database["um0"], database["um1"]
+        _id = (await source.insert_one(url_mapping(7))).inserted_id
+        # A previous run copied the document, then stopped before removing it
+        await target.insert_one(await source.find_one({"_id": _id}))
+        await source.update_one({"_id": _id}, {"$inc": {"hits": 2}})
+
+        assert await ShardRebalancer._move(source, target, _id, "hits")
+
+        assert await source.count_documents({}) == 0
+        # Hits counted on the source since the earlier copy are added to it
+        assert (await target.find_one({"_id": _id}))["hits"] == 7 + 2
+
+    asyncio.run(scenario())
+
+
+def test_run_moves_misplaced_url_mappings_and_creates_routes(mongo_client) -> None:
+    async def scenario() -> None:
+        unsharded = database_client([], [])
+        for index in range(30):
+            await unsharded.insert_url_mapping(url_mapping(index))
+
+        migrating = database_client(SHARDS, UNSHARDED)
+        rebalancer = ShardRebalancer(migrating, batch_size=7)
+        result = await rebalancer.run()
+
+        assert result == {"url_mappings_moved": 30, "routes_moved": 0, "routes_created": 30, "conflicts": 0}
+        sharded = database_client(SHARDS, [])
+        for index in range(30):
+            short_key = f"key{index}"
+            owner = sharded.owners(short_key)[0]
+            document = await owner.url_mappings.find_one({"short_key": short_key})
+            assert document["hits"] == index
+        assert await unsharded.shards["default"].url_mappings.count_documents({}) == 0
+
+        # A second run finds nothing left to do
+        assert await rebalancer.run() == {
+            "url_mappings_moved": 0, "routes_moved": 0, "routes_created": 0, "conflicts": 0
+        }
+
+    asyncio.run(scenario())
+
+
+def test_run_leaves_conflicting_short_keys_in_place(mongo_client) -> None:
+    async def scenario() -> None:
+        unsharded = database_client([], [])
+        for index in range(10):
+            await unsharded.insert_url_mapping(url_mapping(index))
+
+        migrating = database_client(SHARDS, UNSHARDED)
+        await migrating.create_shard_indexes()
+        # The same short key created on the new layout under another _id
+        conflicting = {**url_mapping(3), "target_url": "https://example.com/other"}
+        await migrating.owners("key3")[0].url_mappings.insert_one(conflicting)
+
+        result = await ShardRebalancer(migrating).run(backfill_routes=False)
+
+        assert result["conflicts"] == 1
+        assert result["url_mappings_moved"] == 9
+        left = await unsharded.shards["default"].url_mappings.find({}).to_list(None)
+        assert [document["short_key"] for document in left] == ["key3"]
+        kept = await migrating.owners("key3")[0].url_mappings.find_one({"short_key": "key3"})
+        assert kept["target_url"] == "https://example.com/other"
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import List, Tuple
+
+from starlette.routing import Route
+
+from app.core.middleware.short_key_filter import ShortKeyFilter
+from app.utils.utils import SHORT_KEY_ALPHABET, compile_key_grammar
+
+
+###########
+## Tests ##
+###########
+
+
+def test_key_grammar():
+    grammar = compile_key_grammar(SHORT_KEY_ALPHABET + "_-.", 2, 4)
+
+    assert grammar.fullmatch("ab")
+    assert grammar.fullmatch("a.-_")
+    assert not grammar.fullmatch("a")
+    assert not grammar.fullmatch("abcde")
+    assert not grammar.fullmatch("a b")
+    assert not grammar.fullmatch("ab/c")
+
+
+def get(asgi_app, path: str) -> Tuple[int, List[str]]:
+    """
+    Sends a GET request, returns the status code and the paths the wrapped app received.
+    """
+    received = []
+    status_codes = []
+
+    async def app(scope, receive, send):
+        received.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status_codes.append(message["status"])
+
+    asgi_app.app = app
+    asyncio.run(asgi_app({"type": "http", "method": "GET", "path": path}, None, send))
+    return status_codes[0], received
+
+
+def test_short_key_filter_rejects_keys_outside_the_grammar():
+    async def endpoint(request):
+        pass
+
+    short_key_filter = ShortKeyFilter(
+        None,
+        routes=[Route("/ping", endpoint), Route("/openapi.json", endpoint)],
+        key_grammar=compile_key_grammar(SHORT_KEY_ALPHABET, 2, 8),
+    )
+
+    assert get(short_key_filter, "/abc123") == (200, ["/abc123"])
+    assert get(short_key_filter, "/ping") == (200, ["/ping"])
+    assert get(short_key_filter, "/openapi.json") == (200, ["/openapi.json"])
+    assert get(short_key_filter, "/a/b") == (200, ["/a/b"])
+    assert get(short_key_filter, "/") == (200, ["/"])
+
+    assert get(short_key_filter, "/wp-login.php") == (404, [])
+    assert get(short_key_filter, "/" + "a" * 5000) == (404, [])
+    assert short_key_filter.stats() == {"enabled": True, "rejected_keys": 2}
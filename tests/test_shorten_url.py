@@ -0,0 +1,76 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+from typing import Tuple
+
+import orjson
+
+import app as app_module
+from app.utils.utils import create_short_key
+
+
+###########
+## Tests ##
+###########
+
+
+async def post(path: str, body: dict) -> Tuple[int, dict]:
+    """
+    Sends a POST request with a JSON body to the app, returns the status code and body of the response.
+    """
+    messages = []
+    requests = [{"type": "http.request", "body": orjson.dumps(body), "more_body": False}]
+
+    async def receive():
+        # The whole body is sent at once, then the client stays connected
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await app_module.app(scope, receive, send)
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return messages[0]["status"], orjson.loads(body)
+
+
+def test_overrides_of_an_existing_mapping_are_compared_with_its_redirects() -> None:
+    config = app_module.config
+
+    async def scenario() -> None:
+        async with app_module.app.router.lifespan_context(app_module.app):
+            target_url = f"https://example.com/{create_short_key(12)}"
+            status_code, _ = await post("/shorten_url", {"target_url": target_url, "tags": [], "short_key_length": 8})
+            assert status_code == 201
+
+            # The mapping has no overrides, so it redirects with the settings
+            for overrides, expected_status_code in (
+                ({"redirect_status_code": config.redirect_status_code}, 200),
+                ({"redirect_cache_max_age": config.redirect_cache_max_age}, 200),
+                ({}, 200),
+                ({"redirect_status_code": 301 if config.redirect_status_code != 301 else 308}, 409),
+                ({"redirect_cache_max_age": config.redirect_cache_max_age + 60}, 409),
+            ):
+                status_code, _ = await post(
+                    "/shorten_url", {"target_url": target_url, "tags": [], "short_key_length": 8, **overrides}
+                )
+                assert status_code == expected_status_code, overrides
+
+    asyncio.run(scenario())
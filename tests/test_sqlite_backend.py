@@ -0,0 +1,123 @@
+#############
+## Imports ##
+#############
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.core.models.models import UrlMappingRecord
+from app.core.storage.sqlite_backend import SQLiteStorageBackend
+from app.core.storage.storage_backend import DuplicateShortKeyError
+
+
+###########
+## Tests ##
+###########
+
+
+def url_mapping(short_key: str, target_url: str = "https://example.com") -> UrlMappingRecord:
+    return UrlMappingRecord(target_url=target_url, short_key=short_key, app_version="test")
+
+
+def run(backend: SQLiteStorageBackend, test) -> None:
+    """
+    Runs a test coroutine against the opened backend.
+    """
+    async def main() -> None:
+        await backend.connect()
+        try:
+            await test()
+        finally:
+            await backend.disconnect()
+
+    asyncio.run(main())
+
+
+@pytest.fixture
+def backend(tmp_path) -> SQLiteStorageBackend:
+    return SQLiteStorageBackend(str(tmp_path / "url_shortener.db"), busy_timeout_ms=2000)
+
+
+def test_insert_and_lookups(backend):
+
+    async def test():
+        inserted = await backend.insert(url_mapping("abc12", "https://example.com/a"))
+        assert inserted.id
+
+        assert (await backend.get_by_key("abc12")).target_url == "https://example.com/a"
+        assert (await backend.find_by_target("https://example.com/a")).short_key == "abc12"
+        assert await backend.get_by_key("missing") is None
+        assert await backend.get_many_by_key(["abc12", "missing"]) == [
+            {"short_key": "abc12", "target_url": "https://example.com/a", "is_active": True}
+        ]
+
+        with pytest.raises(DuplicateShortKeyError):
+            await backend.insert(url_mapping("abc12", "https://example.com/b"))
+
+    run(backend, test)
+
+
+def test_hits_are_counted(backend):
+
+    async def test():
+        await backend.insert(url_mapping("abc12"))
+        await backend.increment_hits({"abc12": 2})
+        await backend.increment_hits({"abc12": 1, "missing": 4})
+        assert (await backend.get_by_key("abc12")).hits == 3
+
+    run(backend, test)
+
+
+def test_redirect_target_of_active_mappings_only(backend):
+
+    async def test():
+        await backend.insert(url_mapping("abc12").model_copy(update={"redirect_status_code": 301}))
+        await backend.insert(url_mapping("def34", "https://example.com/d").model_copy(update={"is_active": False}))
+
+        redirect_target = await backend.get_redirect_target("abc12")
+        assert redirect_target == ("https://example.com", 301, None)
+        assert await backend.get_redirect_target("def34") is None
+        assert await backend.get_redirect_target("missing") is None
+
+    run(backend, test)
+
+
+def test_cancelled_write_keeps_write_connection_usable(backend):
+
+    async def test():
+        await backend.insert(url_mapping("abc12"))
+
+        # Another process holds the write lock, so the write waits in its thread
+        other_process = sqlite3.connect(backend.path, isolation_level=None)
+        other_process.execute("BEGIN IMMEDIATE")
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(backend.increment_hits({"abc12": 5}), 0.05)
+
+        other_process.execute("COMMIT")
+        other_process.close()
+
+        # The next write waits for the cancelled one, which is rolled back
+        await backend.insert(url_mapping("def34", "https://example.com/d"))
+        assert (await backend.get_by_key("abc12")).hits == 0
+        assert (await backend.get_by_key("def34")) is not None
+
+    run(backend, test)
+
+
+def test_reads_and_writes_report_their_latency(tmp_path):
+    latencies = []
+    backend = SQLiteStorageBackend(str(tmp_path / "url_shortener.db"), latency_observer=latencies.append)
+
+    async def test():
+        await backend.insert(url_mapping("abc12"))
+        await backend.get_redirect_target("abc12")
+        await backend.increment_hits({"abc12": 1})
+        await backend.get_many_by_key(["abc12"])
+
+        assert len(latencies) == 4
+        assert all(latency >= 0 for latency in latencies)
+
+    run(backend, test)